@@ -0,0 +1,163 @@
+"""Сравнение пропускной способности WSGI и ASGI при высокой конкурентности.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.asgi_vs_wsgi --requests 2000 --concurrency 64
+
+Каждый режим работает в отдельном процессе (под ASGI подключаются
+асинхронные view), запросы идут прямо в обработчики Django без
+сетевого сервера, так что сравнивается именно стоимость обработки.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.common import latency_summary, setup_django
+
+PATHS = ('/', '/news/1/')
+
+
+def prepare(database, news_count, comments_per_news):
+    """Создаём базу с новостями и комментариями."""
+    setup_django(database, async_views=False)
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from news.models import Comment, News
+
+    call_command('migrate', verbosity=0)
+    user = get_user_model().objects.create(username='bench')
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст новости.')
+        for index in range(news_count)
+    )
+    for news in News.objects.all():
+        Comment.objects.bulk_create(
+            Comment(news=news, author=user, text=f'Комментарий {index}')
+            for index in range(comments_per_news)
+        )
+    News.objects.recount_comments()
+
+
+def summary(mode, results, elapsed):
+    return {
+        'mode': mode,
+        'errors': sum(status != 200 for _, status in results),
+        **latency_summary([latency for latency, _ in results], elapsed),
+    }
+
+
+def run_wsgi(total, concurrency):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    def call(index):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': PATHS[index % len(PATHS)],
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'wsgi.input': BytesIO(),
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        started = time.perf_counter()
+        response = application(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        b''.join(response)
+        response.close()
+        return time.perf_counter() - started, int(statuses[0].split()[0])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(total)))
+    return summary('wsgi', results, time.perf_counter() - started)
+
+
+def run_asgi(total, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def call(index, semaphore):
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': PATHS[index % len(PATHS)],
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        statuses = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        async with semaphore:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - started, statuses[0]
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(
+            *(call(index, semaphore) for index in range(total))
+        )
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return summary('asgi', results, time.perf_counter() - started)
+
+
+def child(args):
+    setup_django(args.database, async_views=args.mode == 'asgi')
+    run = run_asgi if args.mode == 'asgi' else run_wsgi
+    run(min(args.concurrency, args.requests), args.concurrency)  # прогрев
+    print(json.dumps(run(args.requests, args.concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--news', type=int, default=50)
+    parser.add_argument('--comments', type=int, default=50)
+    parser.add_argument('--database')
+    parser.add_argument('--mode', choices=('wsgi', 'asgi'))
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or os.path.join(directory, 'bench.sqlite3')
+        subprocess.run(
+            [sys.executable, '-c', (
+                'from benchmarks.asgi_vs_wsgi import prepare; '
+                f'prepare({database!r}, {args.news}, {args.comments})'
+            )],
+            check=True,
+        )
+        for mode in ('wsgi', 'asgi'):
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.asgi_vs_wsgi',
+                 '--mode', mode, '--database', database,
+                 '--requests', str(args.requests),
+                 '--concurrency', str(args.concurrency)],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Общие помощники для сценариев нагрузочного тестирования."""
+import os
+import statistics
+
+
+def setup_django(database, async_views=False, **overrides):
+    """Настраиваем Django на отдельную базу до первого соединения."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+    os.environ['NEWS_ASYNC_VIEWS'] = '1' if async_views else '0'
+    import django
+    from django.conf import settings
+
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['NAME'] = database
+    # Замеряем view, а не статику: манифест collectstatic не нужен.
+    overrides.setdefault(
+        'STATICFILES_STORAGE',
+        'django.contrib.staticfiles.storage.StaticFilesStorage',
+    )
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    settings.DEBUG = False
+    django.setup()
+
+
+def percentile(ordered, share):
+    """Перцентиль по отсортированному списку (метод ближайшего ранга)."""
+    index = max(int(round(share * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def latency_summary(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'rps': round(len(ordered) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(ordered, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+    }
@@ -0,0 +1,153 @@
+"""Чтение ленты на фоне непрерывной записи комментариев.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.read_write --readers 16 --writers 4 --seconds 10
+
+Сравниваются два режима, каждый в отдельном процессе: plain — одно
+соединение без PRAGMA (журнал DELETE, писатель блокирует читателей) и
+tuned — WAL, busy_timeout, mmap и чтение через соединение replica.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from benchmarks.common import latency_summary, setup_django
+
+MODES = {
+    'plain': {
+        'DATABASE_ROUTERS': [],
+        'SQLITE_PRAGMAS': {'journal_mode': 'delete'},
+    },
+    'tuned': {},
+}
+
+
+def prepare(database, news_count, comments_count):
+    setup_django(database)
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    call_command(
+        'generate_data', users=10, news=news_count,
+        comments=comments_count, stdout=open(os.devnull, 'w'),
+    )
+
+
+def read_loop(application, deadline, results):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+    }
+    while time.perf_counter() < deadline:
+        statuses = []
+        started = time.perf_counter()
+        response = application(
+            {**environ, 'wsgi.input': BytesIO()},
+            lambda status, headers: statuses.append(status),
+        )
+        b''.join(response)
+        response.close()
+        results.append(
+            (time.perf_counter() - started, int(statuses[0].split()[0]))
+        )
+
+
+def write_loop(deadline, results):
+    from django.db import connections, transaction
+
+    from news.models import Comment, News
+
+    news_id = News.objects.values_list('pk', flat=True).first()
+    author_id = Comment.objects.values_list('author_id', flat=True).first()
+    while time.perf_counter() < deadline:
+        try:
+            with transaction.atomic():
+                Comment.objects.create(
+                    news_id=news_id, author_id=author_id, text='Нагрузка'
+                )
+                News.objects.filter(pk=news_id).change_comment_count(1)
+            results.append(True)
+        except Exception:
+            results.append(False)
+    connections.close_all()
+
+
+def child(args):
+    setup_django(args.database, **MODES[args.mode])
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+
+    application = get_wsgi_application()
+
+    def reader(results):
+        read_loop(application, deadline, results)
+        connections.close_all()
+
+    reads, writes = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=reader, args=(reads,))
+        for _ in range(args.readers)
+    ] + [
+        threading.Thread(target=write_loop, args=(deadline, writes))
+        for _ in range(args.writers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'mode': args.mode,
+        'read_errors': sum(status != 200 for _, status in reads),
+        'writes': sum(writes),
+        'write_errors': writes.count(False),
+        **latency_summary([latency for latency, _ in reads], elapsed),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--database')
+    parser.add_argument('--mode', choices=MODES)
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or os.path.join(directory, 'bench.sqlite3')
+        subprocess.run(
+            [sys.executable, '-c', (
+                'from benchmarks.read_write import prepare; '
+                f'prepare({database!r}, {args.news}, {args.comments})'
+            )],
+            check=True,
+        )
+        for mode in MODES:
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.read_write',
+                 '--mode', mode, '--database', database,
+                 '--readers', str(args.readers),
+                 '--writers', str(args.writers),
+                 '--seconds', str(args.seconds)],
+                check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
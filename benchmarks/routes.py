@@ -0,0 +1,272 @@
+"""Замер задержек и пропускной способности всех маршрутов проекта.
+
+Для каждого размера данных создаётся отдельная база, заполняется
+командой generate_data, и каждый маршрут из news/urls.py и
+yanews/urls.py запрашивается заданное число раз. Результаты пишутся в
+JSON, который можно сравнить с прошлым релизом:
+
+    python -m benchmarks.routes --sizes 1000:10000 --output bench.json
+    python -m benchmarks.routes --compare old.json bench.json
+
+Размер задаётся как «новостей:комментариев».
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import latency_summary, setup_django
+
+DEFAULT_SIZES = ('100:1000', '1000:10000', '10000:100000')
+
+
+def build_routes(client, author_client, admin_client):
+    """Маршрут -> (клиент, путь). Должен покрывать все именованные URL."""
+    from django.urls import reverse
+
+    from news.models import Comment, News
+    from news.pagination import encode_cursor
+
+    hot = News.objects.order_by('-comment_count').first()
+    oldest = News.objects.order_by('date', 'id').first()
+    own = Comment.objects.filter(author__username='bench').first()
+    middle = Comment.objects.filter(news=hot).order_by('created', 'id')[
+        hot.comment_count // 2
+    ]
+    return {
+        'news:home': (client, reverse('news:home')),
+        'news:archive': (client, reverse('news:archive')),
+        'news:archive (deep)': (
+            client, reverse('news:archive') + '?cursor=' + encode_cursor(
+                [oldest.date, oldest.pk + 1]
+            ),
+        ),
+        'news:archive_day': (
+            client, reverse('news:archive_day', args=(
+                hot.date.year, hot.date.month, hot.date.day,
+            )),
+        ),
+        'news:calendar': (client, reverse('news:calendar')),
+        'news:calendar_year': (
+            client, reverse('news:calendar_year', args=(hot.date.year,)),
+        ),
+        'news:calendar_month': (
+            client, reverse(
+                'news:calendar_month', args=(hot.date.year, hot.date.month)
+            ),
+        ),
+        'news:search': (client, reverse('news:search') + '?q=рекорд'),
+        'news:detail': (client, reverse('news:detail', args=(hot.pk,))),
+        'news:detail (auth)': (
+            author_client, reverse('news:detail', args=(hot.pk,)),
+        ),
+        'news:comments': (
+            client, reverse('news:comments', args=(hot.pk,)) + '?cursor='
+            + encode_cursor([middle.created, middle.pk]),
+        ),
+        # Поток событий живёт в LiveEvents под ASGI и не заканчивается;
+        # здесь замеряется ответ 204 для WSGI.
+        'news:events': (client, reverse('news:events', args=(hot.pk,))),
+        'news:feed_rss': (client, reverse('news:feed_rss')),
+        'news:feed_atom': (client, reverse('news:feed_atom')),
+        'news:comments_feed_rss': (
+            client, reverse('news:comments_feed_rss', args=(hot.pk,)),
+        ),
+        'news:comments_feed_atom': (
+            client, reverse('news:comments_feed_atom', args=(hot.pk,)),
+        ),
+        'news:edit': (author_client, reverse('news:edit', args=(own.pk,))),
+        'news:delete': (
+            author_client, reverse('news:delete', args=(own.pk,)),
+        ),
+        'news:metrics': (client, reverse('news:metrics')),
+        'news:api_news': (client, reverse('news:api_news') + '?limit=100'),
+        'news:api_news_comments': (
+            client,
+            reverse('news:api_news_comments', args=(hot.pk,)) + '?limit=100',
+        ),
+        'news:api_author_comments': (
+            client,
+            reverse('news:api_author_comments', args=(own.author_id,))
+            + '?limit=100',
+        ),
+        'users:login': (client, reverse('users:login')),
+        'users:logout': (author_client, reverse('users:logout')),
+        'users:signup': (client, reverse('users:signup')),
+        'admin:index': (admin_client, reverse('admin:index')),
+        'admin:news_news_changelist': (
+            admin_client, reverse('admin:news_news_changelist'),
+        ),
+        'admin:news_news_change': (
+            admin_client, reverse('admin:news_news_change', args=(hot.pk,)),
+        ),
+    }
+
+
+def uncovered(routes):
+    """Именованные маршруты проекта, которых нет в замерах."""
+    from django.urls import get_resolver
+
+    names = set()
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                namespace = pattern.namespace
+                if namespace == 'admin':
+                    continue
+                walk(
+                    pattern.url_patterns,
+                    f'{prefix}{namespace}:' if namespace else prefix,
+                )
+            elif pattern.name:
+                names.add(prefix + pattern.name)
+
+    walk(get_resolver().url_patterns, '')
+    measured = {name.split(' ')[0] for name in routes}
+    return sorted(names - measured)
+
+
+def measure(client, path, iterations):
+    latencies = []
+    statuses = set()
+    size = 0
+    client.get(path)  # прогрев кешей
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request_started = time.perf_counter()
+        response = client.get(path)
+        if response.streaming:
+            size = sum(map(len, response.streaming_content))
+        else:
+            size = len(response.content)
+        latencies.append(time.perf_counter() - request_started)
+        statuses.add(response.status_code)
+    return {
+        'status': sorted(statuses),
+        'bytes': size,
+        **latency_summary(latencies, time.perf_counter() - started),
+    }
+
+
+def child(args):
+    news, comments = map(int, args.size.split(':'))
+    # Без флага /metrics/ отвечает 404, и замер ничего не меряет.
+    setup_django(args.database, METRICS_ENDPOINT_ENABLED=True)
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.test import Client
+
+    from news.models import Comment, News
+
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    call_command(
+        'generate_data', users=max(news // 10, 10), news=news,
+        comments=comments, verbosity=0, stdout=open(os.devnull, 'w'),
+    )
+    generated = time.perf_counter() - started
+    User = get_user_model()
+    author = User.objects.create(username='bench')
+    Comment.objects.create(
+        news=News.objects.order_by('-comment_count').first(),
+        author=author, text='Комментарий для замеров.',
+    )
+    admin = User.objects.create_superuser('bench_admin', password='bench')
+    clients = []
+    for user in (None, author, admin):
+        client = Client(HTTP_HOST='localhost')
+        if user is not None:
+            client.force_login(user)
+        clients.append(client)
+    routes = build_routes(*clients)
+    results = {
+        name: measure(client, path, args.iterations)
+        for name, (client, path) in routes.items()
+    }
+    print(json.dumps({
+        'generate_seconds': round(generated, 2),
+        'uncovered': uncovered(routes),
+        'routes': results,
+    }))
+
+
+def run(args):
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'iterations': args.iterations,
+            'revision': subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True,
+            ).stdout.strip(),
+        },
+        'sizes': {},
+    }
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.routes',
+                 '--child', '--size', size,
+                 '--database', os.path.join(directory, 'bench.sqlite3'),
+                 '--iterations', str(args.iterations)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+        report['sizes'][size] = json.loads(output.splitlines()[-1])
+        for route, result in report['sizes'][size]['routes'].items():
+            print(
+                f'{size:>14} {route:<30} p50={result["p50_ms"]:>8} ms '
+                f'p99={result["p99_ms"]:>8} ms status={result["status"]}'
+            )
+        missing = report['sizes'][size]['uncovered']
+        if missing:
+            print('Не замерены:', ', '.join(missing))
+    with open(args.output, 'w') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def compare(old_path, new_path, threshold):
+    """Печатаем маршруты, у которых медиана выросла больше порога."""
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+    regressions = 0
+    for size, result in new['sizes'].items():
+        before = old['sizes'].get(size, {}).get('routes', {})
+        for route, current in result['routes'].items():
+            if route not in before:
+                continue
+            ratio = current['p50_ms'] / max(before[route]['p50_ms'], 1e-6)
+            if ratio > 1 + threshold:
+                regressions += 1
+                print(
+                    f'{size} {route}: p50 {before[route]["p50_ms"]} -> '
+                    f'{current["p50_ms"]} ms (x{ratio:.2f})'
+                )
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--child', action='store_true')
+    parser.add_argument('--size')
+    parser.add_argument('--database')
+    args = parser.parse_args()
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    if args.child:
+        return child(args)
+    return run(args)
+
+
+if __name__ == '__main__':
+    main()
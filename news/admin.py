@@ -1,15 +1,156 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import Comment, News
+from .models import ArchivedComment, BadWord, Comment, News
+from .search import filter_news
+
+
+class LatestCommentsFormSet(BaseInlineFormSet):
+    """Только последние ADMIN_INLINE_COMMENTS комментариев новости."""
+
+    def get_queryset(self):
+        if not hasattr(self, '_latest'):
+            self._latest = list(
+                super().get_queryset().select_related('author').order_by(
+                    '-created', '-id'
+                )[:settings.ADMIN_INLINE_COMMENTS]
+            )
+        return self._latest
+
+    def _existing_object(self, pk):
+        # Пока форма была открыта, комментарий мог выпасть из среза.
+        return super()._existing_object(pk) or self.model.objects.filter(
+            news=self.instance, pk=pk
+        ).first()
 
 
 class CommentInline(admin.StackedInline):
     model = Comment
+    formset = LatestCommentsFormSet
+    fields = ('author', 'text')
+    autocomplete_fields = ('author',)
+    show_change_link = True
     extra = 0
 
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count', 'archived')
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    search_fields = ('title',)
+    show_full_result_count = False
+    # Флаг ставит archive_comments вместе с переносом ветки.
+    readonly_fields = ('comments_link', 'archived')
     inlines = [
         CommentInline,
     ]
+
+    def get_inlines(self, request, obj):
+        """Архивная ветка только для чтения: её смотрят в архиве."""
+        if obj is not None and obj.archived:
+            return []
+        return super().get_inlines(request, obj)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищем по полнотекстовому индексу, а не LIKE по всей таблице."""
+        if not search_term:
+            return queryset, False
+        return filter_news(queryset, search_term), False
+
+    @admin.display(description='Комментарии')
+    def comments_link(self, obj):
+        if obj.pk is None:
+            return '—'
+        return format_html(
+            '<a href="{}?news__id__exact={}">Все комментарии ({})</a>',
+            reverse(
+                f'admin:news_{obj.comment_model._meta.model_name}_changelist'
+            ),
+            obj.pk,
+            obj.comment_count,
+        )
+
+    def save_formset(self, request, form, formset, change):
+        """Учитываем добавленные и удалённые в инлайне комментарии."""
+        super().save_formset(request, form, formset, change)
+        if formset.model is not Comment:
+            return
+        delta = len(formset.new_objects) - len(formset.deleted_objects)
+        if delta:
+            News.objects.filter(
+                pk=form.instance.pk
+            ).change_comment_count(delta)
+
+
+class CommentAdminForm(forms.ModelForm):
+
+    def clean_news(self):
+        """Архивная ветка закрыта и в админке: её таблица — архивная."""
+        news = self.cleaned_data['news']
+        if news.archived:
+            raise ValidationError('Обсуждение закрыто: новость в архиве.')
+        return news
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    form = CommentAdminForm
+    list_display = ('id', 'news', 'author', 'created', 'flagged')
+    list_filter = ('flagged',)
+    list_select_related = ('news', 'author')
+    raw_id_fields = ('news',)
+    autocomplete_fields = ('author',)
+    ordering = ('-id',)
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        """Новый комментарий или перенос в другую новость — сдвиг счётчиков."""
+        previous = form.initial.get('news') if change else None
+        super().save_model(request, obj, form, change)
+        if previous != obj.news_id:
+            News.objects.filter(pk=obj.news_id).change_comment_count(1)
+            if previous is not None:
+                News.objects.filter(pk=previous).change_comment_count(-1)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        News.objects.filter(pk=obj.news_id).change_comment_count(-1)
+
+    def delete_queryset(self, request, queryset):
+        deltas = {}
+        for news_id in queryset.values_list('news_id', flat=True):
+            deltas[news_id] = deltas.get(news_id, 0) - 1
+        super().delete_queryset(request, queryset)
+        for news_id, delta in deltas.items():
+            News.objects.filter(pk=news_id).change_comment_count(delta)
+
+
+@admin.register(ArchivedComment)
+class ArchivedCommentAdmin(admin.ModelAdmin):
+    """Архив только для просмотра: счётчики новостей на него не смотрят."""
+    list_display = ('id', 'news', 'author', 'created', 'flagged')
+    list_select_related = ('news', 'author')
+    raw_id_fields = ('news', 'author')
+    ordering = ('-id',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BadWord)
+class BadWordAdmin(admin.ModelAdmin):
+    list_display = ('word', 'modified')
+    search_fields = ('word',)
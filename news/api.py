@@ -0,0 +1,188 @@
+"""Потоковое API только для чтения: новости и комментарии в JSON/NDJSON.
+
+Строки читаются через QuerySet.iterator() порциями и сразу уходят
+клиенту, поэтому выгрузка любого объёма идёт в постоянной памяти.
+Параметры запроса:
+
+* fields — список полей через запятую, остальные колонки не читаются;
+* format — json (по умолчанию) или ndjson;
+* limit — сколько записей отдать; без него выгружается всё;
+* cursor — курсор из предыдущего ответа, чтобы продолжить с места.
+
+Если записи остались, json-ответ содержит курсор в поле next, а в
+ndjson он приходит последней строкой вида {"next": "..."}.
+
+Под ASGI Django 3.2 перебирает потоковый ответ синхронно прямо в event
+loop, где ORM запрещён. Там ответ собирается целиком в потоке view,
+а limit не больше API_ASGI_PAGE_SIZE: остальное — по курсору.
+Комментарии архивных новостей выгружаются из архивной таблицы тем же
+запросом (UNION), id у перенесённых комментариев сохраняются.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import generic
+
+from .models import ArchivedComment, Comment, News
+from .pagination import decode_cursor, encode_cursor
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+class StreamingListView(generic.View):
+    """Базовый класс: выгрузка querysets по возрастанию id."""
+    # Таблицы с непересекающимися id, выгружаются одним UNION.
+    querysets = ()
+    # Имя поля в ответе -> путь в ORM.
+    fields = {}
+    default_fields = ()
+
+    def get_querysets(self):
+        return [queryset.all() for queryset in self.querysets]
+
+    def get_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return self.default_fields
+        fields = tuple(
+            name.strip() for name in requested.split(',') if name.strip()
+        )
+        unknown = set(fields) - set(self.fields)
+        if unknown or not fields:
+            raise BadRequest(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            )
+        return fields
+
+    def get_limit(self):
+        limit = self.request.GET.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise BadRequest('limit должен быть целым числом.')
+            if limit <= 0:
+                raise BadRequest('limit должен быть больше нуля.')
+        if isinstance(self.request, ASGIRequest):
+            return min(limit or settings.API_ASGI_PAGE_SIZE,
+                       settings.API_ASGI_PAGE_SIZE)
+        return limit
+
+    def get_after(self):
+        cursor = self.request.GET.get('cursor')
+        if not cursor:
+            return None
+        after, = decode_cursor(cursor, 1)
+        if not isinstance(after, int):
+            raise BadRequest('Некорректный курсор.')
+        return after
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_fields()
+            output = request.GET.get('format', 'json')
+            if output not in CONTENT_TYPES:
+                raise BadRequest('format: json или ndjson.')
+            limit = self.get_limit()
+            after = self.get_after()
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        paths = sorted({self.fields[name] for name in fields} | {'id'})
+        first, *rest = [
+            queryset.filter(
+                **({} if after is None else {'id__gt': after})
+            ).order_by().values(*paths)
+            for queryset in self.get_querysets()
+        ]
+        queryset = first.union(*rest, all=True).order_by('id')
+        if limit is not None:
+            # Лишняя запись показывает, есть ли продолжение.
+            queryset = queryset[:limit + 1]
+        rows = self.stream_rows(
+            queryset.iterator(chunk_size=settings.API_CHUNK_SIZE),
+            fields, limit,
+        )
+        render = self.render_json if output == 'json' else self.render_ndjson
+        if isinstance(request, ASGIRequest):
+            return HttpResponse(
+                ''.join(render(rows)), content_type=CONTENT_TYPES[output]
+            )
+        return StreamingHttpResponse(
+            render(rows), content_type=CONTENT_TYPES[output]
+        )
+
+    def stream_rows(self, rows, fields, limit):
+        """Записи с нужными полями; в конце — курсор или None."""
+        last_id = None
+        for index, row in enumerate(rows):
+            if limit is not None and index == limit:
+                yield None, encode_cursor([last_id])
+                return
+            last_id = row['id']
+            yield {name: row[self.fields[name]] for name in fields}, None
+        yield None, None
+
+    def render_json(self, rows):
+        yield '{"results": ['
+        separator = ''
+        for row, next_cursor in rows:
+            if row is None:
+                yield f'], "next": {dumps(next_cursor)}}}'
+                return
+            yield separator + dumps(row)
+            separator = ', '
+
+    def render_ndjson(self, rows):
+        for row, next_cursor in rows:
+            if row is not None:
+                yield dumps(row) + '\n'
+            elif next_cursor is not None:
+                yield dumps({'next': next_cursor}) + '\n'
+
+
+class NewsStream(StreamingListView):
+    querysets = (News.objects.all(),)
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'text': 'text',
+        'date': 'date',
+        'comment_count': 'comment_count',
+    }
+    default_fields = ('id', 'title', 'date', 'comment_count')
+
+
+class CommentStream(StreamingListView):
+    querysets = (Comment.objects.all(), ArchivedComment.objects.all())
+    fields = {
+        'id': 'id',
+        'news': 'news_id',
+        'author_id': 'author_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+        'modified': 'modified',
+    }
+    default_fields = ('id', 'news', 'author', 'text', 'created')
+    # Фильтр по URL-параметру pk: news_id или author_id.
+    lookup = None
+
+    def get_querysets(self):
+        return [
+            queryset.filter(**{self.lookup: self.kwargs['pk']})
+            for queryset in super().get_querysets()
+        ]
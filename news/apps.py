@@ -1,3 +1,5 @@
+import logging
+
 from django.apps import AppConfig
 
 
@@ -5,3 +7,14 @@ class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import checks, signals  # noqa: F401
+        for warning in checks.check_shared_cache(None):
+            # Под gunicorn/uvicorn проверки не запускаются: пишем в лог.
+            logging.getLogger(__name__).warning(warning.msg)
+        if settings.WARM_START:
+            from .warmup import warm_up
+            warm_up()
@@ -0,0 +1,161 @@
+"""Асинхронные версии ленты и страницы новости для запуска под ASGI.
+
+Работа с базой и рендер шаблонов уходят в потоки через sync_to_async.
+Если ASYNC_DB_CONCURRENT включён, независимые запросы (новость и
+пользователь при отправке отзыва) выполняются параллельно в отдельных
+потоках, каждый со своим соединением, которое закрывается сразу после
+запроса. Иначе всё идёт через общий поток, как у синхронных view.
+"""
+import asyncio
+from calendar import timegm
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import get_user as get_request_user
+from django.contrib.auth.views import redirect_to_login
+from django.db import connections
+from django.http import (
+    HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect,
+)
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from . import conditional, metrics
+from .cache import feed_version, fragment_version
+from .forms import CommentForm
+from .models import News
+from .personal import render_shared
+from .views import check_open, comments_page, save_comment
+
+
+def _isolated(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
+
+
+def run_db(func, *args, **kwargs):
+    """Выполняем синхронную работу с базой вне event loop."""
+    if settings.ASYNC_DB_CONCURRENT:
+        return sync_to_async(_isolated(func), thread_sensitive=False)(
+            *args, **kwargs
+        )
+    return sync_to_async(func)(*args, **kwargs)
+
+
+def _resolve_user(request):
+    """Достаём пользователя из сессии; результат кешируется в request."""
+    return get_request_user(request)
+
+
+def _validators(request, etag_func, last_modified_func, *args):
+    """
+    Валидаторы считаются до загрузки новостей: на 304 база не нужна.
+
+    В ETag входит пользователь, поэтому он загружается здесь же.
+    """
+    _resolve_user(request)
+    last_modified = last_modified_func(request, *args)
+    return etag_func(request, *args), last_modified
+
+
+def _not_modified(request, etag, last_modified):
+    """Ответ 304/412 по валидаторам или None, если нужно рендерить."""
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag),
+        last_modified=last_modified and timegm(last_modified.utctimetuple()),
+    )
+
+
+def _render(request, template_name, context):
+    with metrics.timed_render():
+        return render(request, template_name, context)
+
+
+def _set_validators(response, etag, last_modified):
+    if last_modified is not None:
+        response.headers.setdefault('Last-Modified', http_date(
+            timegm(last_modified.utctimetuple())
+        ))
+    response.headers.setdefault('ETag', quote_etag(etag))
+    return response
+
+
+async def news_list(request):
+    """Асинхронный аналог NewsList."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD'))
+    etag, last_modified = await run_db(
+        _validators, request,
+        conditional.feed_etag, conditional.feed_last_modified,
+    )
+    response = _not_modified(request, etag, last_modified)
+    if response is None:
+        # Ленивый queryset: из базы он читается, только если страницы
+        # нет в кеше, как и у синхронного NewsList.
+        news_feed = News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        response = HttpResponse(await run_db(lambda: render_shared(
+            request, 'news/home.html',
+            {'object_list': news_feed, 'news_feed': news_feed},
+            'feed', feed_version(),
+        )))
+    return _set_validators(response, etag, last_modified)
+
+
+def _detail_context(news):
+    return {
+        'object': news,
+        'news': news,
+        'comments': comments_page(news.pk, model=news.comment_model),
+    }
+
+
+def _render_detail(request, news):
+    return HttpResponse(render_shared(
+        request, 'news/detail.html', _detail_context(news),
+        news.pk, fragment_version(news.pk),
+    ))
+
+
+async def news_detail(request, pk):
+    """Асинхронный аналог NewsDetailView: GET — страница, POST — отзыв."""
+    if request.method == 'POST':
+        return await _post_comment(request, pk)
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD', 'POST'))
+    etag, last_modified = await run_db(
+        _validators, request,
+        conditional.news_etag, conditional.news_last_modified, pk,
+    )
+    response = _not_modified(request, etag, last_modified)
+    if response is None:
+        news = await run_db(get_object_or_404, News, pk=pk)
+        response = await run_db(_render_detail, request, news)
+    return _set_validators(response, etag, last_modified)
+
+
+async def _post_comment(request, pk):
+    news, user = await asyncio.gather(
+        run_db(get_object_or_404, News, pk=pk),
+        run_db(_resolve_user, request),
+    )
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    check_open(news)
+    form = CommentForm(request.POST)
+    if not await run_db(form.is_valid):
+        # Форму с ошибками подставит вставка comment_form.
+        request.comment_form = form
+        return await run_db(
+            lambda: _render(request, 'news/detail.html', _detail_context(news))
+        )
+    await run_db(save_comment, form, news, user)
+    return HttpResponseRedirect(
+        reverse('news:detail', kwargs={'pk': news.pk}) + '#comments'
+    )
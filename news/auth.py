@@ -0,0 +1,43 @@
+"""Пользователь из кеша вместо запроса к auth_user на каждый запрос.
+
+Сессии хранятся в cached_db, так что у авторизованного запроса в
+обычном случае нет ни одного запроса к базе до самого view. Запись
+пользователя сбрасывается сигналами при любом его изменении.
+
+Всё это только с общим для воркеров кешем: в кеше процесса сброс
+не дошёл бы до других воркеров, и заблокированный пользователь или
+сменённый пароль продолжали бы действовать. Тогда пользователь
+читается из базы, как в ModelBackend.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import is_shared
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_user(user_id):
+    """Сбрасываем сейчас и после коммита, как и версии фрагментов."""
+    key = user_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        if not is_shared():
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,138 @@
+"""Версионный кеш фрагментов страниц.
+
+У каждой новости есть версия — случайный токен в кеше с отметкой
+времени. Сигналы меняют его при любом изменении новости или её
+комментариев, и все фрагменты, собранные под старой версией, перестают
+совпадать; по отметке времени отдаётся Last-Modified. Сами фрагменты
+хранятся вместе с версией, под которой собраны: пока один воркер
+пересобирает устаревший фрагмент, остальные отдают прежний вариант,
+а не идут в базу всей толпой.
+"""
+import hashlib
+from time import monotonic, sleep, time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LOCK_POLL_INTERVAL = 0.05
+# Сброс этой области устаревает все фрагменты сразу (массовые правки).
+GLOBAL_SCOPE = 'all'
+# Меняется при любом изменении новостей или комментариев.
+FEED_SCOPE = 'feed'
+
+
+def is_shared(alias='default'):
+    """
+    Общий ли кеш для всех процессов.
+
+    В локальном кеше процесса (LocMemCache) сброс версии виден только
+    воркеру, который его сделал, а блокировка пересборки не мешает
+    соседям: остальные воркеры отдают устаревшие страницы до
+    FRAGMENT_CACHE_TIMEOUT.
+    """
+    backend = settings.CACHES[alias]['BACKEND']
+    return backend not in settings.PROCESS_LOCAL_CACHES
+
+
+def news_scope(news_pk):
+    return f'news:{news_pk}'
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def _new_version(previous=None):
+    """
+    Токен «секунды.случайная часть».
+
+    Секунды строго растут от версии к версии: Last-Modified имеет
+    точность до секунды, и правка в ту же секунду, что и прошлый ответ,
+    иначе осталась бы незамеченной для If-Modified-Since.
+    """
+    stamp = int(time())
+    if previous is not None:
+        stamp = max(stamp, version_time(previous) + 1)
+    return f'{stamp}.{uuid4().hex}'
+
+
+def version_time(version):
+    """Unix-время, когда версия выпущена."""
+    return int(version.partition('.')[0])
+
+
+def get_version(scope):
+    """Текущая версия области; создаётся при первом обращении."""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    previous = cache.get_many(keys)
+    cache.set_many(
+        {key: _new_version(previous.get(key)) for key in keys}, None
+    )
+
+
+def invalidate(*scopes):
+    """
+    Сбрасываем версии сейчас и ещё раз после коммита транзакции.
+
+    Второй сброс нужен, чтобы фрагмент, собранный другим воркером по
+    ещё не закоммиченным данным, не остался в кеше под новой версией.
+    """
+    bump_version(*scopes)
+    transaction.on_commit(lambda: bump_version(*scopes))
+
+
+def fragment_version(news_pk):
+    """Версия фрагментов новости с учётом глобальной версии."""
+    return (get_version(GLOBAL_SCOPE), get_version(news_scope(news_pk)))
+
+
+def feed_version():
+    """Версия страниц ленты: меняется при любой правке новостей."""
+    return (get_version(GLOBAL_SCOPE), get_version(FEED_SCOPE))
+
+
+def fragment_key(name, news_pk, vary_on=()):
+    vary = hashlib.md5(':'.join(map(str, vary_on)).encode()).hexdigest()
+    return f'fragment:{name}:{news_pk}:{vary}'
+
+
+def get_or_build(key, version, build):
+    """
+    Фрагмент из кеша или собранный build() не более чем одним воркером.
+
+    Если фрагмент устарел, а его уже пересобирает другой воркер, отдаём
+    устаревший вариант. Если варианта нет совсем, недолго ждём соседа и
+    только потом собираем сами.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.FRAGMENT_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            value = build()
+            cache.set(key, (version, value), settings.FRAGMENT_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return value
+    if entry is not None:
+        return entry[1]
+    deadline = monotonic() + lock_timeout
+    while monotonic() < deadline:
+        sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return build()
@@ -0,0 +1,20 @@
+"""Проверки настроек проекта (manage.py check)."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .cache import is_shared
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Версионный кеш страниц работает только с общим для воркеров кешем."""
+    if settings.DEBUG or is_shared():
+        return []
+    return [Warning(
+        f'Кеш {settings.CACHES["default"]["BACKEND"]} локален для '
+        f'процесса: сброс версий страниц не дойдёт до других воркеров, '
+        f'и они будут отдавать устаревшие страницы.',
+        hint='Настройте memcached (NEWS_CACHE_BACKEND, NEWS_CACHE_LOCATION) '
+             'или файловый кеш.',
+        id='news.W001',
+    )]
@@ -0,0 +1,69 @@
+"""Валидаторы для условных GET-запросов (ETag / Last-Modified).
+
+Оба валидатора берутся из версий кеша фрагментов, которые сигналы
+меняют при любой правке новостей и комментариев, в том числе при
+удалении, — база для них не нужна. Last-Modified — время выпуска самой
+свежей из версий. Блок самых обсуждаемых в ленте меняется раз в
+TRENDING_REFRESH секунд, и номер этого интервала тоже входит в
+валидаторы ленты. Страницы персональны, так что в ETag входит и
+пользователь.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from . import trending
+from .cache import feed_version, fragment_version, version_time
+
+
+def _modified(versions, *moments):
+    return datetime.fromtimestamp(
+        max([*map(version_time, versions), *moments]), tz=timezone.utc
+    )
+
+
+def _etag(request, *parts):
+    raw = ':'.join(
+        map(str, (request.user.pk, request.get_full_path(), *parts))
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _once_per_request(func):
+    """condition() зовёт обе функции, а версии нужны обеим."""
+    attr = f'_{func.__name__}'
+
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attr):
+            setattr(request, attr, func(request, *args, **kwargs))
+        return getattr(request, attr)
+    return wrapper
+
+
+@_once_per_request
+def _feed_versions(request):
+    return feed_version(), trending.block_version()
+
+
+def feed_last_modified(request, *args, **kwargs):
+    versions, block = _feed_versions(request)
+    return _modified(versions, block * settings.TRENDING_REFRESH)
+
+
+def feed_etag(request, *args, **kwargs):
+    versions, block = _feed_versions(request)
+    return _etag(request, *versions, block)
+
+
+@_once_per_request
+def _news_versions(request, pk):
+    return fragment_version(pk)
+
+
+def news_last_modified(request, pk, *args, **kwargs):
+    return _modified(_news_versions(request, pk))
+
+
+def news_etag(request, pk, *args, **kwargs):
+    return _etag(request, *_news_versions(request, pk))
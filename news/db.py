@@ -0,0 +1,43 @@
+"""Разделение чтения и записи между соединениями и настройка SQLite.
+
+Записи всегда идут в default, чтение — в replica, если она описана в
+DATABASES. Внутри транзакции на default читаем оттуда же, иначе
+транзакция не увидит собственных изменений.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+
+def apply_pragmas(connection):
+    """Выполняем SQLITE_PRAGMAS; реплику дополнительно делаем read-only."""
+    if connection.vendor != 'sqlite' or connection.connection is None:
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.alias == REPLICA:
+        # Режим журнала хранится в файле и меняется только на запись.
+        pragmas.pop('journal_mode', None)
+        pragmas['query_only'] = 'on'
+    for name, value in pragmas.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            REPLICA not in settings.DATABASES
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
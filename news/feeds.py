@@ -0,0 +1,154 @@
+"""RSS и Atom: последние новости и комментарии к новости.
+
+Лента собирается один раз на версию из кеша фрагментов и хранится
+целиком вместе со своими ETag и Last-Modified. Оба валидатора
+считаются от версии, под которой лента собрана: дата последней записи
+не сдвигается ни от новости за тот же день, ни от правок и удалений.
+Повторный опрос агрегатора получает 304 из кеша, без единого запроса
+к базе.
+"""
+import hashlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date
+
+from .cache import (
+    feed_version, fragment_key, fragment_version, get_or_build, version_time,
+)
+from .models import News
+
+
+class LatestNewsFeed(Feed):
+    title = 'YaNews: последние новости'
+    description = 'Свежие новости YaNews.'
+
+    def link(self):
+        return reverse('news:home')
+
+    def items(self):
+        return News.objects.all()[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('news:detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return timezone.make_aware(datetime.combine(item.date, time.min))
+
+
+class LatestNewsAtomFeed(LatestNewsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestNewsFeed.description
+
+
+class NewsCommentsFeed(Feed):
+
+    def get_object(self, request, pk):
+        return get_object_or_404(News, pk=pk)
+
+    def title(self, obj):
+        return f'Комментарии: {obj.title}'
+
+    def description(self, obj):
+        return f'Новые комментарии к новости «{obj.title}».'
+
+    def link(self, obj):
+        return reverse('news:detail', args=(obj.pk,)) + '#comments'
+
+    def items(self, obj):
+        return obj.comment_model.objects.filter(news=obj).select_related(
+            'author'
+        ).order_by('-created', '-id')[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.author.username
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse(
+            'news:detail', args=(item.news_id,)
+        ) + f'#comment-{item.pk}'
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.created
+
+    def item_updateddate(self, item):
+        return item.modified
+
+
+class NewsCommentsAtomFeed(NewsCommentsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(feed, get_version):
+    """
+    View, отдающий ленту из кеша с поддержкой условных запросов.
+
+    get_version(**kwargs) — версия кеша фрагментов, от которой зависит
+    содержимое ленты.
+    """
+    def view(request, **kwargs):
+        version = get_version(**kwargs)
+        # Параметры запроса ленты не меняют: в ключе только путь.
+        key = fragment_key('feed', request.get_host(), [request.path])
+
+        def build():
+            response = feed(request, **kwargs)
+            raw = ':'.join(map(str, (key, *version)))
+            return {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(raw.encode()).hexdigest()),
+                'last_modified': max(map(version_time, version)),
+            }
+        entry = get_or_build(key, version, build)
+        response = get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=entry['last_modified'],
+        )
+        if response is None:
+            response = HttpResponse(
+                entry['content'], content_type=entry['content_type']
+            )
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        return response
+    return view
+
+
+def news_feed_version(**kwargs):
+    return feed_version()
+
+
+def comments_feed_version(pk):
+    return fragment_version(pk)
+
+
+latest_news_rss = cached_feed(LatestNewsFeed(), news_feed_version)
+latest_news_atom = cached_feed(LatestNewsAtomFeed(), news_feed_version)
+news_comments_rss = cached_feed(NewsCommentsFeed(), comments_feed_version)
+news_comments_atom = cached_feed(
+    NewsCommentsAtomFeed(), comments_feed_version
+)
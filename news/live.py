@@ -0,0 +1,215 @@
+"""Живая лента комментариев через Server-Sent Events.
+
+Подписчики на новость держат открытое соединение с LiveEvents (только
+под ASGI) и ждут событий в своей asyncio-очереди; базу они не
+опрашивают. Сигналы комментариев публикуют в Broker готовое событие
+после коммита — фрагмент HTML рендерится один раз на всех подписчиков
+и только если они есть.
+
+Рассылка внутри процесса: подписчик получает правки, сделанные в том
+же воркере (запросы ASGI-воркера и его потоков sync_to_async).
+Отставшему клиенту, у которого переполнилась очередь, отправляется
+reset: страница перечитывает ветку целиком.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from itertools import count
+from threading import Lock
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+
+from .models import News
+
+EVENTS_URL_NAME = 'events'
+RESET = 'event: reset\ndata: {}\n\n'
+
+
+class Subscription:
+    """Очередь событий одного клиента в его event loop."""
+
+    def __init__(self, channel, size):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(size)
+        self.lost = False
+
+    def deliver(self, message):
+        """Вызывается в event loop подписчика."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lost = True
+
+
+class Broker:
+    """Рассылка событий подписчикам каналов в пределах процесса."""
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = Lock()
+        self._ids = count(1)
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel, settings.LIVE_QUEUE_SIZE)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return channel in self._channels
+
+    def publish(self, channel, event, data):
+        """Потокобезопасно: публиковать можно из любого потока."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        if not subscribers:
+            return 0
+        message = (
+            f'id: {next(self._ids)}\nevent: {event}\n'
+            f'data: {json.dumps(data, ensure_ascii=False)}\n\n'
+        )
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(
+                subscription.deliver, message
+            )
+        return len(subscribers)
+
+
+broker = Broker()
+
+
+def news_channel(news_pk):
+    return f'news:{news_pk}'
+
+
+def publish_comment(event, comment):
+    """
+    Событие created/edited с фрагментом комментария.
+
+    Фрагмент рендерим сразу — это снимок на момент правки, — а
+    рассылаем после коммита транзакции.
+    """
+    channel = news_channel(comment.news_id)
+    if not broker.has_subscribers(channel):
+        return
+    data = {
+        'id': comment.pk,
+        'html': render_to_string(
+            'news/comment.html', {'comment': comment, 'live': True}
+        ),
+    }
+    transaction.on_commit(lambda: broker.publish(channel, event, data))
+
+
+def publish_deletion(comment):
+    channel = news_channel(comment.news_id)
+    if not broker.has_subscribers(channel):
+        return
+    data = {'id': comment.pk}
+    transaction.on_commit(lambda: broker.publish(channel, 'deleted', data))
+
+
+class LiveEvents:
+    """
+    ASGI-обёртка: поток событий новости, остальное — в Django.
+
+    Django 3.2 отдаёт StreamingHttpResponse синхронно, поэтому долгие
+    соединения держим здесь, не занимая потоков.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        pk = self.news_pk(scope)
+        if pk is None:
+            return await self.app(scope, receive, send)
+        from .async_views import run_db
+
+        exists = await run_db(News.objects.filter(pk=pk).exists)
+        if not exists:
+            await send({
+                'type': 'http.response.start', 'status': 404,
+                'headers': [(b'content-type', b'text/plain')],
+            })
+            return await send({'type': 'http.response.body'})
+        await self.stream(broker.subscribe(news_channel(pk)), receive, send)
+
+    def news_pk(self, scope):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return None
+        if not scope['path'].endswith(f'/{EVENTS_URL_NAME}/'):
+            return None
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            return None
+        if match.url_name != EVENTS_URL_NAME:
+            return None
+        return match.kwargs['pk']
+
+    async def disconnected(self, receive):
+        """
+        Ждём отключения клиента.
+
+        Сервер сначала отдаёт тело запроса (у GET — пустое сообщение
+        http.request), оно не означает отключения.
+        """
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def stream(self, subscription, receive, send):
+        await send({
+            'type': 'http.response.start', 'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        disconnect = asyncio.ensure_future(self.disconnected(receive))
+        try:
+            await send({
+                'type': 'http.response.body',
+                'body': f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode(),
+                'more_body': True,
+            })
+            while True:
+                message = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    (message, disconnect),
+                    timeout=settings.LIVE_KEEPALIVE,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    message.cancel()
+                    return
+                if message not in done:
+                    message.cancel()
+                    body = ': keepalive\n\n'
+                elif subscription.lost:
+                    body = RESET
+                else:
+                    body = message.result()
+                await send({
+                    'type': 'http.response.body',
+                    'body': body.encode(),
+                    'more_body': body != RESET,
+                })
+                if body == RESET:
+                    return
+        finally:
+            disconnect.cancel()
+            broker.unsubscribe(subscription)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from news.cache import invalidate, news_scope
+from news.models import ArchivedComment, Comment, News
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит комментарии новостей старше заданного возраста в '
+        'архивную таблицу пачками по новостям; ветка переносится '
+        'целиком и дальше доступна только для чтения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int,
+            default=settings.COMMENT_ARCHIVE_AFTER_DAYS,
+            help='Возраст новости в днях.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько новостей переносить в одной транзакции.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза в секундах между пачками, чтобы пропустить записи.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['older_than'])
+        stale = News.objects.filter(
+            date__lt=cutoff, archived=False
+        ).order_by('date', 'id')
+        started = perf_counter()
+        stories = comments = 0
+        while True:
+            ids = list(
+                stale.values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            comments += self.archive(ids)
+            stories += len(ids)
+            self.stderr.write(
+                f'Новостей {stories}, комментариев {comments}'
+            )
+            if options['pause']:
+                sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'В архив перенесено {comments} комментариев {stories} '
+            f'новостей за {perf_counter() - started:.1f} с'
+        ))
+
+    def archive(self, ids):
+        """
+        Копируем ветки одним INSERT ... SELECT и удаляем из Comment.
+
+        Удаляем тоже SQL-запросом: сигналы на каждый комментарий здесь
+        не нужны, версии кеша новостей сбрасываем один раз на пачку.
+        """
+        using = router.db_for_write(Comment)
+        columns = ', '.join(
+            field.column for field in ArchivedComment._meta.concrete_fields
+        )
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic(using=using), \
+                connections[using].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {ArchivedComment._meta.db_table} ({columns}) '
+                f'SELECT {columns} FROM {Comment._meta.db_table} '
+                f'WHERE news_id IN ({placeholders})',
+                ids,
+            )
+            moved = cursor.rowcount
+            cursor.execute(
+                f'DELETE FROM {Comment._meta.db_table} '
+                f'WHERE news_id IN ({placeholders})',
+                ids,
+            )
+            News.objects.using(using).filter(pk__in=ids).update(
+                archived=True
+            )
+            invalidate(*(news_scope(pk) for pk in ids))
+        return moved
@@ -0,0 +1,92 @@
+import random
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from news import trending
+from news.cache import GLOBAL_SCOPE, invalidate
+from news.models import Comment, DailyRollup, News
+
+WORDS = (
+    'новость', 'город', 'студенты', 'блог', 'робот', 'погода', 'рекорд',
+    'выпускники', 'технология', 'приложение', 'конкурс', 'рекурсия',
+)
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, новостями и '
+        'комментариями пакетами bulk_create (для нагрузочных тестов).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=365 * 5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        User = get_user_model()
+        users = self.generate(
+            User, options['users'],
+            lambda index: User(username=f'user{index}', password='!'),
+        )
+        today = date.today()
+        news = self.generate(
+            News, options['news'],
+            lambda index: News(
+                title=sentence(self.rng, 3)[:50],
+                text=sentence(self.rng, 40),
+                date=today - timedelta(
+                    days=self.rng.randrange(options['days'])
+                ),
+            ),
+        )
+        if not (users and news):
+            return
+        self.generate(
+            Comment, options['comments'],
+            lambda index: Comment(
+                news_id=self.rng.randint(*news),
+                author_id=self.rng.randint(*users),
+                text=sentence(self.rng, 12),
+            ),
+        )
+        News.objects.recount_comments()
+        DailyRollup.objects.rebuild()
+        trending.rebuild()
+        invalidate(GLOBAL_SCOPE)
+
+    def generate(self, model, count, build):
+        """Создаём count объектов; возвращаем диапазон их id."""
+        first = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        started = perf_counter()
+        for offset in range(0, count, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    build(first + index)
+                    for index in range(
+                        offset, min(offset + self.batch_size, count)
+                    )
+                )
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {count} '
+            f'за {elapsed:.1f} с ({count / max(elapsed, 1e-9):.0f} в секунду)'
+        )
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        if last < first:
+            return None
+        return first, last
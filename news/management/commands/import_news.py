@@ -0,0 +1,243 @@
+import csv
+import json
+import sys
+from collections import Counter
+from datetime import date
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from news import trending
+from news.cache import FEED_SCOPE, GLOBAL_SCOPE, invalidate
+from news.models import Comment, DailyRollup, News
+
+TITLE_MAX_LENGTH = News._meta.get_field('title').max_length
+EXTERNAL_ID_MAX_LENGTH = News._meta.get_field('external_id').max_length
+
+
+class RowError(ValueError):
+    pass
+
+
+def optional(row, field):
+    """Строка поля без пробелов по краям; числа из NDJSON — как строки."""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise RowError(f'поле {field} должно быть строкой, а не {value!r}')
+    return str(value).strip()
+
+
+def required(row, field):
+    value = optional(row, field)
+    if not value:
+        raise RowError(f'нет поля {field}')
+    return value
+
+
+def clean_news(row):
+    title = required(row, 'title')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise RowError(f'title длиннее {TITLE_MAX_LENGTH} символов')
+    external_id = optional(row, 'external_id') or None
+    if external_id and len(external_id) > EXTERNAL_ID_MAX_LENGTH:
+        raise RowError(
+            f'external_id длиннее {EXTERNAL_ID_MAX_LENGTH} символов'
+        )
+    day = optional(row, 'date')
+    try:
+        day = date.fromisoformat(day) if day else None
+    except ValueError:
+        raise RowError(f'некорректная дата {row["date"]!r}')
+    return {
+        'external_id': external_id,
+        'title': title,
+        'text': required(row, 'text'),
+        'date': day or date.today(),
+    }
+
+
+def clean_comment(row):
+    return {
+        'news_external_id': required(row, 'news_external_id'),
+        'author': required(row, 'author'),
+        'text': required(row, 'text'),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости (или комментарии) из NDJSON/CSV: '
+        'пакетный bulk_create в транзакциях по частям, обновление '
+        'новостей по external_id и продолжение с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument(
+            '--kind', choices=('news', 'comments'), default='news',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: сколько записей уже загружено.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stats = Counter()
+        self.checkpoint = (
+            Path(options['checkpoint']) if options['checkpoint'] else None
+        )
+        done = self.read_checkpoint()
+        if options['path'] == '-':
+            self.load(sys.stdin, done)
+            return
+        try:
+            file = open(options['path'], encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(f'Не открыть {options["path"]}: {error}')
+        with file:
+            self.load(file, done)
+
+    def read_checkpoint(self):
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return 0
+        done = int(self.checkpoint.read_text() or 0)
+        self.stderr.write(f'Продолжаем после записи {done}.')
+        return done
+
+    def records(self, file):
+        file_format = self.options['format'] or (
+            'csv' if self.options['path'].endswith('.csv') else 'ndjson'
+        )
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield error
+
+    def load(self, file, done):
+        clean, write = {
+            'news': (clean_news, self.write_news),
+            'comments': (clean_comment, self.write_comments),
+        }[self.options['kind']]
+        records = enumerate(self.records(file), 1)
+        for _ in islice(records, done):
+            pass
+        started = perf_counter()
+        position = done
+        while True:
+            chunk = list(islice(records, self.options['batch_size']))
+            if not chunk:
+                break
+            rows = []
+            for number, record in chunk:
+                try:
+                    if not isinstance(record, dict):
+                        raise RowError(f'не разобрать запись: {record}')
+                    rows.append(clean(record))
+                except RowError as error:
+                    self.stats['skipped'] += 1
+                    self.stderr.write(f'Запись {number} пропущена: {error}')
+            position = chunk[-1][0]
+            with transaction.atomic():
+                write(rows)
+                invalidate(GLOBAL_SCOPE, FEED_SCOPE)
+            self.save_checkpoint(position)
+            self.report(position - done, started)
+        self.stdout.write(self.style.SUCCESS(
+            'Готово: ' + ', '.join(
+                f'{key} {value}' for key, value in sorted(self.stats.items())
+            ) if self.stats else 'Новых записей нет.'
+        ))
+
+    def save_checkpoint(self, position):
+        if self.checkpoint is not None:
+            temporary = self.checkpoint.with_suffix('.tmp')
+            temporary.write_text(str(position))
+            temporary.replace(self.checkpoint)
+
+    def report(self, processed, started):
+        elapsed = perf_counter() - started
+        self.stderr.write(
+            f'{processed} записей, {processed / max(elapsed, 1e-9):.0f} '
+            f'в секунду'
+        )
+
+    def write_news(self, rows):
+        by_external_id = {
+            row['external_id']: row for row in rows if row['external_id']
+        }
+        existing = {}
+        days = {row['date'] for row in rows}
+        for external_id, news_id, day in News.objects.filter(
+            external_id__in=by_external_id
+        ).values_list('external_id', 'id', 'date'):
+            existing[external_id] = news_id
+            days.add(day)
+        updated = [
+            News(id=news_id, **by_external_id[external_id])
+            for external_id, news_id in existing.items()
+        ]
+        created = [
+            News(**row) for row in rows
+            if row['external_id'] is None
+        ] + [
+            News(**row) for external_id, row in by_external_id.items()
+            if external_id not in existing
+        ]
+        News.objects.bulk_create(created)
+        News.objects.bulk_update(
+            updated, ('title', 'text', 'date'), batch_size=500
+        )
+        # bulk-операции обходят сигналы: пересобираем затронутые дни.
+        DailyRollup.objects.rebuild(days)
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(updated)
+
+    def write_comments(self, rows):
+        # В архивные ветки не пишем: они закрыты для комментариев.
+        news_ids = dict(News.objects.filter(
+            external_id__in={row['news_external_id'] for row in rows},
+            archived=False,
+        ).values_list('external_id', 'id'))
+        authors = dict(get_user_model().objects.filter(
+            username__in={row['author'] for row in rows}
+        ).values_list('username', 'id'))
+        comments = []
+        for row in rows:
+            news_id = news_ids.get(row['news_external_id'])
+            author_id = authors.get(row['author'])
+            if news_id is None or author_id is None:
+                self.stats['skipped'] += 1
+                self.stderr.write(
+                    f'Комментарий пропущен: нет открытой новости '
+                    f'{row["news_external_id"]} или автора {row["author"]}'
+                )
+                continue
+            comments.append(Comment(
+                news_id=news_id, author_id=author_id, text=row['text']
+            ))
+        Comment.objects.bulk_create(comments)
+        deltas = Counter(comment.news_id for comment in comments)
+        for news_id, delta in deltas.items():
+            News.objects.filter(pk=news_id).change_comment_count(delta)
+            # bulk_create обходит сигналы: счётчики рейтинга сдвигаем сами.
+            trending.record(news_id, timezone.now(), delta)
+        self.stats['created'] += len(comments)
@@ -0,0 +1,40 @@
+from time import perf_counter, sleep
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии пачками по индексу expire_date, '
+        'не блокируя базу одним большим DELETE (замена clearsessions).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза в секундах между пачками, чтобы пропустить записи.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        started = perf_counter()
+        total = 0
+        while True:
+            keys = list(expired.values_list('pk', flat=True)[
+                :options['batch_size']
+            ])
+            if not keys:
+                break
+            with transaction.atomic():
+                deleted, _ = Session.objects.filter(pk__in=keys).delete()
+            total += deleted
+            if options['pause']:
+                sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено сессий: {total} за {perf_counter() - started:.1f} с'
+        ))
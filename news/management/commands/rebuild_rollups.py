@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from news.models import DailyRollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает сводку новостей и комментариев по дням '
+        '(после массовых операций в обход сигналов).'
+    )
+
+    def handle(self, *args, **options):
+        days = DailyRollup.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Дней в сводке: {days}'))
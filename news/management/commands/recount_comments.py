@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from news.cache import GLOBAL_SCOPE, invalidate
+from news.models import DailyRollup, News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчик комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'ids', nargs='*', type=int,
+            help='id новостей; по умолчанию пересчитываются все.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = News.objects.all()
+        days = None
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+            days = set(queryset.values_list('date', flat=True))
+        updated = queryset.recount_comments()
+        DailyRollup.objects.rebuild(days)
+        invalidate(GLOBAL_SCOPE)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано новостей: {updated}')
+        )
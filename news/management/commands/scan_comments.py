@@ -0,0 +1,126 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from news.models import ArchivedComment, Comment
+from news.moderation import init_scanner, matcher, scan_chunk
+
+# Ограничение SQLite на число параметров в одном запросе — 999.
+UPDATE_BATCH_SIZE = 500
+# Архив сохраняет id комментариев, так что id не пересекаются и одна
+# контрольная точка годится для обеих таблиц.
+SCANNED_MODELS = (Comment, ArchivedComment)
+
+
+class Command(BaseCommand):
+    help = (
+        'Перепроверяет сохранённые комментарии, в том числе архивные, по '
+        'текущему списку стоп-слов в пуле процессов и помечает найденные '
+        '(flagged). '
+        'Читает пачками по первичному ключу и продолжает с контрольной '
+        'точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов; 1 — проверять в текущем процессе.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: id последнего проверенного.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.checkpoint = (
+            Path(options['checkpoint']) if options['checkpoint'] else None
+        )
+        last = self.read_checkpoint()
+        words = matcher.words()
+        self.started = perf_counter()
+        self.scanned = self.flagged = 0
+        if options['workers'] > 1:
+            with ProcessPoolExecutor(
+                options['workers'], initializer=init_scanner,
+                initargs=(words,),
+            ) as pool:
+                self.scan_parallel(pool, last)
+        else:
+            init_scanner(words)
+            for chunk in self.chunks(last):
+                self.write(chunk[-1][0], len(chunk), scan_chunk(chunk))
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено {self.scanned}, помечено {self.flagged} '
+            f'за {perf_counter() - self.started:.1f} с'
+        ))
+
+    def scan_parallel(self, pool, last):
+        """
+        Держим в работе не больше двух пачек на процесс, чтобы память
+        не зависела от размера таблицы; результаты пишем по порядку,
+        поэтому контрольная точка не перескакивает непроверенные id.
+        """
+        pending = deque()
+        for chunk in self.chunks(last):
+            pending.append(
+                (chunk[-1][0], len(chunk), pool.submit(scan_chunk, chunk))
+            )
+            if len(pending) >= 2 * self.options['workers']:
+                self.write_done(pending.popleft())
+        while pending:
+            self.write_done(pending.popleft())
+
+    def write_done(self, item):
+        last, size, future = item
+        self.write(last, size, future.result())
+
+    def chunks(self, last):
+        """Пачки (id, text) по возрастанию id, начиная после last."""
+        while True:
+            first, *rest = [
+                model.objects.filter(pk__gt=last).order_by()
+                .values_list('id', 'text')
+                for model in SCANNED_MODELS
+            ]
+            chunk = list(first.union(*rest, all=True).order_by('id')[
+                :self.options['chunk_size']
+            ])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1][0]
+
+    def write(self, last, size, flagged):
+        for start in range(0, len(flagged), UPDATE_BATCH_SIZE):
+            for model in SCANNED_MODELS:
+                model.objects.filter(
+                    pk__in=flagged[start:start + UPDATE_BATCH_SIZE]
+                ).update(flagged=True)
+        self.scanned += size
+        self.flagged += len(flagged)
+        self.save_checkpoint(last)
+        elapsed = perf_counter() - self.started
+        self.stderr.write(
+            f'{self.scanned} комментариев, '
+            f'{self.scanned / max(elapsed, 1e-9):.0f} в секунду, '
+            f'помечено {self.flagged}'
+        )
+
+    def read_checkpoint(self):
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return 0
+        last = int(self.checkpoint.read_text() or 0)
+        self.stderr.write(f'Продолжаем после комментария {last}.')
+        return last
+
+    def save_checkpoint(self, last):
+        if self.checkpoint is not None:
+            temporary = self.checkpoint.with_suffix('.tmp')
+            temporary.write_text(str(last))
+            temporary.replace(self.checkpoint)
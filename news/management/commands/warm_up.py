@@ -0,0 +1,26 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from news import metrics
+from news.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует шаблоны, строит URL-резолверы и загружает переводы, '
+        'как при старте воркера с WARM_START; печатает время этапов.'
+    )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        counts = warm_up()
+        for stage in ('templates', 'urls', 'locale'):
+            self.stdout.write(
+                f'{stage}: {metrics.BOOT_TIMINGS[stage]:.3f} с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Шаблонов: {counts["templates"]}, '
+            f'маршрутов: {counts["patterns"]}, '
+            f'всего {perf_counter() - started:.3f} с'
+        ))
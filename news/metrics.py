@@ -0,0 +1,173 @@
+"""Метрики производительности запросов в формате Prometheus.
+
+Статистика текущего запроса живёт в contextvar: его видят и обёртка
+SQL-запросов на всех соединениях (в том числе в потоках sync_to_async),
+и middleware. Гистограммы копятся в памяти процесса и отдаются текстом
+в формате Prometheus.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+TIME_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current = ContextVar('request_stats', default=None)
+# Этап старта воркера -> секунды (заполняет news.warmup).
+BOOT_TIMINGS = {}
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'render_time', '_lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self._lock = Lock()
+
+    def add_query(self, duration):
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+
+    def add_render(self, duration):
+        with self._lock:
+            self.render_time += duration
+
+
+def current():
+    """Статистика текущего запроса или None вне middleware."""
+    return _current.get()
+
+
+@contextmanager
+def collect():
+    """Собираем статистику всего, что выполняется внутри блока."""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_render():
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.add_render(perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrappers."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(perf_counter() - started)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # view -> [счётчики по корзинам..., +Inf], сумма
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(
+                view, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[index] += 1
+            self._series[view] = counts, total + value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = {
+                view: (list(counts), total)
+                for view, (counts, total) in self._series.items()
+            }
+        for view, (counts, total) in sorted(series.items()):
+            label = f'view="{view}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                )
+            yield f'{self.name}_sum{{{label}}} {total}'
+            yield f'{self.name}_count{{{label}}} {cumulative}'
+
+
+HISTOGRAMS = {
+    'duration': Histogram(
+        'yanews_request_duration_seconds',
+        'Время обработки запроса.', TIME_BUCKETS,
+    ),
+    'queries': Histogram(
+        'yanews_db_queries', 'SQL-запросов на запрос.', QUERY_BUCKETS,
+    ),
+    'db_time': Histogram(
+        'yanews_db_duration_seconds',
+        'Время в базе на запрос.', TIME_BUCKETS,
+    ),
+    'render_time': Histogram(
+        'yanews_render_duration_seconds',
+        'Время рендера шаблонов на запрос.', TIME_BUCKETS,
+    ),
+    'size': Histogram(
+        'yanews_response_size_bytes', 'Размер ответа.', SIZE_BUCKETS,
+    ),
+}
+
+
+def observe(view, duration, stats, size=None):
+    HISTOGRAMS['duration'].observe(view, duration)
+    HISTOGRAMS['queries'].observe(view, stats.queries)
+    HISTOGRAMS['db_time'].observe(view, stats.db_time)
+    HISTOGRAMS['render_time'].observe(view, stats.render_time)
+    if size is not None:
+        HISTOGRAMS['size'].observe(view, size)
+
+
+def render_boot():
+    if not BOOT_TIMINGS:
+        return
+    name = 'yanews_worker_boot_seconds'
+    yield f'# HELP {name} Время этапов старта воркера.'
+    yield f'# TYPE {name} gauge'
+    for stage, seconds in sorted(BOOT_TIMINGS.items()):
+        yield f'{name}{{stage="{stage}"}} {seconds}'
+
+
+def render_prometheus():
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    lines.extend(render_boot())
+    return '\n'.join(lines) + '\n'
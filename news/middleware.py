@@ -0,0 +1,237 @@
+import asyncio
+import json
+import mimetypes
+import os
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from . import metrics, personal
+
+# Кодировка -> расширение заранее сжатой копии, в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class PerformanceMiddleware:
+    """
+    Считаем для каждого view число SQL-запросов, время в базе,
+    время рендера и размер ответа.
+
+    Работает и в синхронной, и в асинхронной цепочке, чтобы под ASGI
+    не добавлять асинхронным view лишних переходов между потоками.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django узнаёт, что middleware — корутина.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = perf_counter()
+        with metrics.collect() as stats:
+            response = self.get_response(request)
+        self.observe(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        with metrics.collect() as stats:
+            response = await self.get_response(request)
+        self.observe(request, response, stats, started)
+        return response
+
+    def process_template_response(self, request, response):
+        """Засекаем рендер TemplateResponse: он идёт сразу после хука."""
+        started = perf_counter()
+        stats = metrics.current()
+
+        def finish(response):
+            if stats is not None:
+                stats.add_render(perf_counter() - started)
+        response.add_post_render_callback(finish)
+        return response
+
+    def observe(self, request, response, stats, started):
+        match = getattr(request, 'resolver_match', None)
+        metrics.observe(
+            match.view_name if match else 'unresolved',
+            perf_counter() - started,
+            stats,
+            None if response.streaming else len(response.content),
+        )
+
+
+class StaticFile:
+    __slots__ = ('path', 'content_type', 'mtime', 'etag', 'variants')
+
+    def __init__(self, path, variants):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'{self.mtime:x}-{stat.st_size:x}'
+        # кодировка -> путь к сжатой копии
+        self.variants = variants
+
+
+def scan_static_root(root):
+    """Путь от STATIC_URL -> StaticFile для всех собранных файлов."""
+    files = {}
+    for directory, _, names in os.walk(root):
+        present = set(names)
+        for name in names:
+            if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                continue
+            path = os.path.join(directory, name)
+            variants = {
+                encoding: path + suffix
+                for encoding, suffix in ENCODINGS
+                if name + suffix in present
+            }
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[relative] = StaticFile(path, variants)
+    return files
+
+
+def hashed_names(root):
+    """Имена с хешем из манифеста collectstatic: кешируются навсегда."""
+    try:
+        with open(os.path.join(root, 'staticfiles.json')) as file:
+            return set(json.load(file)['paths'].values())
+    except (OSError, ValueError, KeyError):
+        return set()
+
+
+class StaticFilesMiddleware:
+    """
+    Отдаём собранную статику из STATIC_ROOT, когда перед нами нет CDN.
+
+    Каталог читается один раз при старте: на запрос — один поиск в
+    словаре. Клиенту уходит .br или .gz-копия, если он их принимает;
+    файлы с хешем в имени кешируются на год.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.SERVE_STATIC or not (
+            settings.STATIC_ROOT and os.path.isdir(settings.STATIC_ROOT)
+        ):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.prefix = settings.STATIC_URL
+        self.files = scan_static_root(settings.STATIC_ROOT)
+        self.immutable = hashed_names(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not (
+            request.path_info.startswith(self.prefix)
+        ):
+            return None
+        name = request.path_info[len(self.prefix):]
+        static = self.files.get(name)
+        if static is None:
+            return None
+        encoding, path = self.choose_variant(request, static)
+        etag = quote_etag(f'{static.etag}-{encoding}' if encoding else (
+            static.etag
+        ))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=static.mtime
+        )
+        if response is None:
+            response = FileResponse(
+                open(path, 'rb'), content_type=static.content_type
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(static.mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE if name in self.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        return response
+
+    @staticmethod
+    def choose_variant(request, static):
+        accepted = {
+            token.split(';')[0].strip()
+            for token in request.headers.get('Accept-Encoding', '').split(',')
+            if not token.replace(' ', '').endswith(';q=0')
+        }
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in static.variants:
+                return encoding, static.variants[encoding]
+        return None, static.path
+
+
+class PersonalizeMiddleware:
+    """
+    Подставляем в HTML-ответ персональные вставки вместо меток.
+
+    Стоит после AuthenticationMiddleware (нужен request.user) и после
+    CsrfViewMiddleware, чтобы токен из формы попал в cookie.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.marker = personal.MARKER.encode()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.personalize(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if not self.has_markers(response):
+            return response
+        return await sync_to_async(self.personalize)(request, response)
+
+    def has_markers(self, response):
+        """Метки ставят только HTML-шаблоны; JSON и прочее не трогаем."""
+        return (
+            not response.streaming
+            and response.get('Content-Type', '').startswith('text/html')
+            and self.marker in response.content
+        )
+
+    def personalize(self, request, response):
+        if not self.has_markers(response):
+            return response
+        response.content = personal.personalize(
+            request, response.content.decode(response.charset)
+        )
+        return response
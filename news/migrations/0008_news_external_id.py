@@ -0,0 +1,29 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+from news import search
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite пересоздаёт news_news при добавлении поля и теряет триггеры.
+    if schema_editor.connection.vendor == 'sqlite':
+        search.create_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_news_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Идентификатор новости в системе редакции.', max_length=64, null=True, unique=True, verbose_name='Внешний id'),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop
+        ),
+    ]
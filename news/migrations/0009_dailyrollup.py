@@ -0,0 +1,48 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:02
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rollups(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    DailyRollup = apps.get_model('news', 'DailyRollup')
+    totals = News.objects.order_by().values('date').annotate(
+        news_total=Count('pk'), comment_total=Sum('comment_count')
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                day=row['date'],
+                news_count=row['news_total'],
+                comment_count=row['comment_total'],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='День')),
+                ('news_count', models.PositiveIntegerField(default=0, verbose_name='Новостей')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+            options={
+                'verbose_name': 'Сводка по дню',
+                'verbose_name_plural': 'Сводки по дням',
+                'ordering': ('day',),
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='flagged',
+            field=models.BooleanField(default=False, help_text='Выставляется командой scan_comments.', verbose_name='Нарушает правила'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('flagged', True)), fields=['id'], name='comment_flagged_idx'),
+        ),
+    ]
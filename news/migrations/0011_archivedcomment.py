@@ -0,0 +1,53 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from news import search
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite пересоздаёт news_news при добавлении поля и теряет триггеры.
+    if schema_editor.connection.vendor == 'sqlite':
+        search.create_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('news', '0010_comment_flagged'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='archived',
+            field=models.BooleanField(default=False, editable=False, help_text='Комментарии перенесены в архив и закрыты для правки.', verbose_name='В архиве'),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('created', models.DateTimeField()),
+                ('modified', models.DateTimeField()),
+                ('flagged', models.BooleanField(default=False, verbose_name='Нарушает правила')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news')),
+            ],
+            options={
+                'verbose_name': 'Архивный комментарий',
+                'verbose_name_plural': 'Архив комментариев',
+                'ordering': ('created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['news', 'created', 'id'], name='archived_news_created_id_idx'),
+        ),
+    ]
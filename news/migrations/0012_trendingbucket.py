@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0011_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveIntegerField(verbose_name='Интервал')),
+                ('count', models.IntegerField(default=0, verbose_name='Комментариев')),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.news')),
+            ],
+            options={
+                'verbose_name': 'Счётчик обсуждаемости',
+                'verbose_name_plural': 'Счётчики обсуждаемости',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trendingbucket',
+            constraint=models.UniqueConstraint(fields=('bucket', 'news'), name='trending_bucket_news_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0012_trendingbucket'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_modified_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_news_modified_idx',
+        ),
+    ]
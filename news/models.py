@@ -1,22 +1,79 @@
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncYear
+
+
+def as_day(value):
+    """Дата новости: поле по умолчанию заполняется datetime.today()."""
+    return value.date() if isinstance(value, datetime) else value
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def change_comment_count(self, delta):
+        """Атомарно сдвигаем счётчик комментариев и сводку по дням."""
+        days = Counter(self.values_list('date', flat=True))
+        updated = self.update(comment_count=F('comment_count') + delta)
+        for day, count in days.items():
+            DailyRollup.objects.add(day, comments=delta * count)
+        return updated
+
+    def recount_comments(self):
+        """Пересчитываем счётчик по Comment и архиву ArchivedComment."""
+        def count(model):
+            counts = model.objects.filter(
+                news=OuterRef('pk')
+            ).order_by().values('news').annotate(
+                total=Count('pk')
+            ).values('total')
+            return Coalesce(Subquery(counts), 0)
+        return self.update(
+            comment_count=count(Comment) + count(ArchivedComment)
+        )
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    external_id = models.CharField(
+        'Внешний id',
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text='Идентификатор новости в системе редакции.',
+    )
+    archived = models.BooleanField(
+        'В архиве',
+        default=False,
+        editable=False,
+        help_text='Комментарии перенесены в архив и закрыты для правки.',
+    )
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    @property
+    def comment_model(self):
+        """Таблица комментариев новости: рабочая или архивная."""
+        return ArchivedComment if self.archived else Comment
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +86,225 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+    flagged = models.BooleanField(
+        'Нарушает правила',
+        default=False,
+        help_text='Выставляется командой scan_comments.',
+    )
+
+    class Meta:
+        ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('id',),
+                name='comment_flagged_idx',
+                condition=models.Q(flagged=True),
+            ),
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_id_idx',
+            ),
+        )
+
+    # Архивные комментарии только для чтения (см. ArchivedComment).
+    archived = False
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class ArchivedComment(models.Model):
+    """
+    Комментарии старых новостей, перенесённые командой archive_comments.
+
+    Ветка новости переносится целиком вместе с id, поэтому рабочая
+    таблица Comment и её индексы растут только со свежими обсуждениями.
+    Даты копируются как есть, без auto_now.
+    """
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    text = models.TextField()
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    flagged = models.BooleanField('Нарушает правила', default=False)
+
+    archived = True
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='archived_news_created_id_idx',
+            ),
+        )
+        verbose_name_plural = 'Архив комментариев'
+        verbose_name = 'Архивный комментарий'
 
     def __str__(self):
         return self.text[:50]
+
+
+class BadWord(models.Model):
+    """Стоп-слово, которое модераторы добавляют без выкладки кода."""
+    word = models.CharField('Слово', max_length=100, unique=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name_plural = 'Стоп-слова'
+        verbose_name = 'Стоп-слово'
+
+    def __str__(self):
+        return self.word
+
+
+class DailyRollupQuerySet(models.QuerySet):
+
+    def add(self, day, news=0, comments=0):
+        """Сдвигаем счётчики за день, создавая строку при необходимости."""
+        changes = {
+            'news_count': F('news_count') + news,
+            'comment_count': F('comment_count') + comments,
+        }
+        if not self.filter(day=day).update(**changes):
+            self.get_or_create(day=day)
+            self.filter(day=day).update(**changes)
+
+    def rebuild(self, days=None):
+        """Пересобираем сводку из News (все дни или только days)."""
+        news = News.objects.order_by()
+        rollups = self.all()
+        if days is not None:
+            news = news.filter(date__in=days)
+            rollups = rollups.filter(day__in=days)
+        totals = news.values('date').annotate(
+            news_total=Count('pk'), comment_total=Sum('comment_count')
+        )
+        with transaction.atomic():
+            rollups.delete()
+            return len(self.bulk_create(
+                (
+                    DailyRollup(
+                        day=row['date'],
+                        news_count=row['news_total'],
+                        comment_count=row['comment_total'],
+                    )
+                    for row in totals.iterator()
+                ),
+                batch_size=1000,
+            ))
+
+    def periods(self, year=None, month=None):
+        """
+        Непустые периоды архива: годы, месяцы года или дни месяца.
+
+        Читаем только сводку, поэтому время не зависит от объёма новостей.
+        """
+        queryset = self.filter(news_count__gt=0)
+        if year is None:
+            period = TruncYear('day')
+        elif month is None:
+            period = TruncMonth('day')
+            queryset = queryset.filter(
+                day__gte=date(year, 1, 1), day__lt=date(year + 1, 1, 1)
+            )
+        else:
+            start = date(year, month, 1)
+            end = date(year + month // 12, month % 12 + 1, 1)
+            return queryset.filter(day__gte=start, day__lt=end).values_list(
+                'day', 'news_count', 'comment_count'
+            ).order_by('day')
+        return queryset.annotate(period=period).values('period').annotate(
+            news_total=Sum('news_count'), comment_total=Sum('comment_count')
+        ).values_list('period', 'news_total', 'comment_total').order_by(
+            'period'
+        )
+
+
+class DailyRollup(models.Model):
+    """Число новостей и их комментариев за день для навигации по архиву."""
+    day = models.DateField('День', unique=True)
+    news_count = models.PositiveIntegerField('Новостей', default=0)
+    comment_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    objects = DailyRollupQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('day',)
+        verbose_name_plural = 'Сводки по дням'
+        verbose_name = 'Сводка по дню'
+
+    def __str__(self):
+        return f'{self.day}: {self.news_count}'
+
+
+class TrendingBucketQuerySet(models.QuerySet):
+
+    def add(self, news_pk, bucket, delta):
+        """
+        Сдвигаем счётчик интервала, создавая строку при необходимости.
+
+        Вычитать из несуществующей строки нечего; к тому же при каскадном
+        удалении новости её строки уже удалены, и создавать их нельзя.
+        """
+        changes = {'count': F('count') + delta}
+        rows = self.filter(news_id=news_pk, bucket=bucket)
+        if not rows.update(**changes) and delta > 0:
+            self.get_or_create(news_id=news_pk, bucket=bucket)
+            rows.update(**changes)
+
+    def rebuild(self, since, bucket_of):
+        """
+        Пересобираем интервалы начиная с since по таблице Comment.
+
+        bucket_of(created) — номер интервала для даты комментария.
+        """
+        counts = Counter(
+            (news_pk, bucket_of(created))
+            for news_pk, created in Comment.objects.filter(
+                created__gte=since
+            ).values_list('news_id', 'created').iterator()
+        )
+        first = bucket_of(since)
+        with transaction.atomic():
+            self.filter(bucket__gte=first).delete()
+            self.bulk_create(
+                (
+                    TrendingBucket(news_id=news_pk, bucket=bucket, count=count)
+                    for (news_pk, bucket), count in counts.items()
+                    if bucket >= first
+                ),
+                batch_size=1000,
+            )
+        return len(counts)
+
+
+class TrendingBucket(models.Model):
+    """
+    Новые комментарии к новости за интервал TRENDING_BUCKET_SECONDS.
+
+    Долговременная копия счётчиков из news/trending.py; строки старше
+    самого длинного окна удаляет rebuild_trending.
+    """
+    news = models.ForeignKey(News, on_delete=models.CASCADE)
+    bucket = models.PositiveIntegerField('Интервал')
+    count = models.IntegerField('Комментариев', default=0)
+
+    objects = TrendingBucketQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('bucket', 'news'), name='trending_bucket_news_uniq'
+            ),
+        )
+        verbose_name_plural = 'Счётчики обсуждаемости'
+        verbose_name = 'Счётчик обсуждаемости'
+
+    def __str__(self):
+        return f'{self.news_id}@{self.bucket}: {self.count}'
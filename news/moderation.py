@@ -0,0 +1,143 @@
+"""Поиск запрещённых слов в комментариях.
+
+Все стоп-слова собираются в автомат Ахо — Корасик, поэтому текст
+проверяется за один проход независимо от длины списка. Список состоит из
+BAD_WORDS и слов из модели BadWord; изменения в базе подхватываются на
+лету: в своём процессе — сразу по сигналу, в остальных воркерах — при
+очередной сверке отпечатка списка (не чаще BAD_WORDS_RELOAD_INTERVAL).
+"""
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+BAD_WORDS = (
+    'редиска',
+    'негодяй',
+    'писька',
+    # Дополните список на своё усмотрение.
+)
+
+
+class Automaton:
+    """Автомат Ахо — Корасик для поиска любого из слов в тексте."""
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def _add(self, word):
+        node = 0
+        for char in word:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            node = child
+        if node and self._output[node] is None:
+            self._output[node] = word
+
+    def _link(self):
+        """Строим суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                if self._output[child] is None:
+                    self._output[child] = self._output[self._fail[child]]
+
+    def find(self, text):
+        """Первое найденное в тексте слово или None."""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node] is not None:
+                return output[node]
+        return None
+
+
+class BadWordMatcher:
+    """Держит актуальный автомат и перестраивает его при смене списка."""
+
+    def __init__(self, base_words=BAD_WORDS):
+        self.base_words = base_words
+        self._automaton = None
+        self._fingerprint = None
+        self._checked_at = None
+        self._lock = Lock()
+
+    def invalidate(self):
+        """Сверить список с базой при следующей проверке."""
+        self._checked_at = None
+
+    def _fetch_fingerprint(self):
+        from .models import BadWord
+
+        stats = BadWord.objects.aggregate(
+            total=Count('pk'), modified=Max('modified')
+        )
+        return stats['total'], stats['modified']
+
+    def words(self):
+        """Актуальный список стоп-слов в нижнем регистре."""
+        from .models import BadWord
+
+        db_words = BadWord.objects.values_list('word', flat=True)
+        words = {word.lower() for word in (*self.base_words, *db_words)}
+        return sorted(word for word in words if word)
+
+    def _build(self):
+        return Automaton(self.words())
+
+    def get_automaton(self):
+        interval = settings.BAD_WORDS_RELOAD_INTERVAL
+        checked_at = self._checked_at
+        if checked_at is not None and monotonic() - checked_at < interval:
+            return self._automaton
+        with self._lock:
+            fingerprint = self._fetch_fingerprint()
+            if self._automaton is None or fingerprint != self._fingerprint:
+                self._automaton = self._build()
+                self._fingerprint = fingerprint
+            self._checked_at = monotonic()
+            return self._automaton
+
+    def find(self, text):
+        """Первое найденное стоп-слово (без учёта регистра) или None."""
+        return self.get_automaton().find(text.lower())
+
+
+matcher = BadWordMatcher()
+
+
+# Проверка уже сохранённых комментариев в пуле процессов
+# (scan_comments). Воркеры не ходят в базу: автомат строится один раз
+# на процесс из переданного списка слов.
+_scanner = None
+
+
+def init_scanner(words):
+    global _scanner
+    _scanner = Automaton(words)
+
+
+def scan_chunk(rows):
+    """Id комментариев из пачки (id, text), в которых есть стоп-слова."""
+    return [pk for pk, text in rows if _scanner.find(text.lower())]
@@ -0,0 +1,101 @@
+"""Курсорная (keyset) пагинация.
+
+Вместо номера страницы клиент получает непрозрачный курсор со значениями
+ключа сортировки последней показанной записи. Следующая страница
+выбирается условием «строго после курсора», поэтому стоимость запроса
+не зависит от того, насколько далеко пользователь пролистал ленту.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(values):
+    """Упаковываем значения ключа сортировки в строку для URL."""
+    raw = json.dumps([
+        value.isoformat() if hasattr(value, 'isoformat') else value
+        for value in values
+    ], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Распаковываем курсор; ValueError, если он испорчен."""
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('Некорректный курсор.')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Некорректный курсор.')
+    return values
+
+
+def after_cursor(ordering, values):
+    """
+    Условие «запись идёт после курсора» для заданной сортировки.
+
+    Для ('-date', '-id') это date < d OR (date = d AND id < i).
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class KeysetPage:
+    """
+    Одна страница курсорной выборки.
+
+    Запрос выполняется лениво, при первом обращении к object_list,
+    поэтому страницу можно отдавать в кешируемый фрагмент шаблона.
+    """
+
+    def __init__(self, queryset, ordering, per_page, cursor=None):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.per_page = per_page
+        if cursor:
+            values = decode_cursor(cursor, len(ordering))
+            try:
+                self.queryset = self.queryset.filter(
+                    after_cursor(ordering, values)
+                )
+            except (TypeError, ValidationError):
+                raise ValueError('Некорректный курсор.')
+
+    @cached_property
+    def _rows(self):
+        # Берём на одну запись больше, чтобы узнать о следующей странице.
+        return list(self.queryset[:self.per_page + 1])
+
+    @property
+    def object_list(self):
+        return self._rows[:self.per_page]
+
+    @property
+    def has_next(self):
+        return len(self._rows) > self.per_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(
+            getattr(last, field.lstrip('-')) for field in self.ordering
+        )
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
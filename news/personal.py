@@ -0,0 +1,108 @@
+"""Общие страницы с персональными вставками.
+
+Лента и страница новости собираются без данных пользователя и
+кешируются одной копией на всех. Места, которые зависят от
+пользователя (блок входа, ссылки на правку своих комментариев, форма
+с CSRF-токеном), в них — метки <!--personal:имя:аргументы-->.
+PersonalizeMiddleware заменяет метки перед отправкой ответа; это
+дешёво и не ходит в базу, кроме загрузки самого пользователя.
+"""
+import re
+from inspect import signature
+
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import format_html
+
+from . import metrics
+from .cache import fragment_key, get_or_build
+from .forms import CommentForm
+
+MARKER = '<!--personal:'
+MARKER_RE = re.compile(r'<!--personal:([a-z_]+)((?::-?\d+)*)-->')
+
+PARTS = {}
+# Сколько числовых аргументов ждёт вставка (кроме request).
+ARITY = {}
+# Параметры запроса, которые меняют общую страницу; остальные (метки
+# рекламных кампаний, мусор от ботов) не плодят копий в кеше.
+SHARED_PAGE_PARAMS = ('cursor',)
+
+
+def part(name):
+    """Регистрируем функцию, которая рендерит вставку по метке."""
+    def register(func):
+        PARTS[name] = func
+        ARITY[name] = len(signature(func).parameters) - 1
+        return func
+    return register
+
+
+def marker(name, *args):
+    return f'{MARKER}{name}{"".join(f":{int(arg)}" for arg in args)}-->'
+
+
+@part('user_box')
+def user_box(request):
+    return render_to_string(
+        'includes/user_box.html', {'user': request.user}
+    )
+
+
+@part('comment_controls')
+def comment_controls(request, comment_pk, author_pk):
+    if request.user.pk != author_pk:
+        return ''
+    return format_html(
+        '<a href="{}">Редактировать</a> | <a href="{}">Удалить</a>',
+        reverse('news:edit', args=(comment_pk,)),
+        reverse('news:delete', args=(comment_pk,)),
+    )
+
+
+@part('comment_form')
+def comment_form(request, news_pk):
+    if not request.user.is_authenticated:
+        return ''
+    form = getattr(request, 'comment_form', None) or CommentForm()
+    return render_to_string(
+        'news/comment_form.html', {'form': form}, request=request
+    )
+
+
+def personalize(request, content):
+    """
+    Подставляем вставки вместо меток; одинаковые рендерим один раз.
+
+    Метки с неизвестным именем или числом аргументов — не наши (их мог
+    прислать пользователь), их оставляем как есть.
+    """
+    rendered = {}
+
+    def replace(match):
+        if match.group(0) not in rendered:
+            name = match.group(1)
+            args = [int(arg) for arg in match.group(2).split(':')[1:]]
+            rendered[match.group(0)] = (
+                PARTS[name](request, *args)
+                if ARITY.get(name) == len(args) else match.group(0)
+            )
+        return rendered[match.group(0)]
+    return MARKER_RE.sub(replace, content)
+
+
+def render_shared(request, template_name, context, scope, version):
+    """
+    Страница без данных пользователя, одна на всех в пределах версии.
+
+    Ключ — путь и параметры из SHARED_PAGE_PARAMS: курсоры — разные
+    страницы.
+    """
+    key = fragment_key('page', scope, [request.path, *(
+        request.GET.get(name, '') for name in SHARED_PAGE_PARAMS
+    )])
+
+    def build():
+        with metrics.timed_render():
+            return render_to_string(template_name, context, request=request)
+    return get_or_build(key, version, build)
@@ -1,13 +1,21 @@
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timedelta
+from importlib import reload
+import os
+import traceback
 
 import pytest
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from django.test.client import Client
-from django.urls import reverse
+from django.urls import clear_url_caches, reverse
 from django.utils import timezone
 
+from news import urls as news_urls
 from news.models import Comment, News
+from yanews import urls as project_urls
 
 
 @pytest.fixture(autouse=True)
@@ -16,6 +24,120 @@ def enable_db_access_for_all_tests(db):
     pass
 
 
+@pytest.fixture(autouse=True)
+def plain_static_storage(settings):
+    """Тесты не запускают collectstatic: манифеста со статикой нет."""
+    settings.STATICFILES_STORAGE = (
+        'django.contrib.staticfiles.storage.StaticFilesStorage'
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш фрагментов не должен переживать тест."""
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Общий для воркеров кеш, как в бою: файловый, с сессиями cached_db."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path / 'cache'),
+    }}
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+IGNORED_ORIGINS = (
+    os.path.join('news', 'metrics.py'),
+    os.path.join('news', 'middleware.py'),
+    'conftest.py',
+)
+
+
+class QueryLog:
+    """SQL-запросы блока вместе с местом в коде проекта, откуда они ушли."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = traceback.extract_stack()[:-1]
+        project = [
+            frame for frame in stack
+            if frame.filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in frame.filename
+            and not frame.filename.endswith(IGNORED_ORIGINS)
+        ]
+        caller = next(
+            frame for frame in reversed(stack)
+            if f'django{os.sep}db{os.sep}' not in frame.filename
+            and not frame.filename.endswith(IGNORED_ORIGINS)
+        )
+        if caller not in project:
+            project.append(caller)
+        self.queries.append((sql, [
+            f'{frame.filename}:{frame.lineno} in {frame.name}'
+            for frame in project[-3:]
+        ]))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self):
+        return '\n'.join(
+            f'{index}. {sql}\n' + ''.join(f'     {line}\n' for line in origin)
+            for index, (sql, origin) in enumerate(self.queries, 1)
+        )
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Проверяем число SQL-запросов в блоке.
+
+    with query_budget(5): ...          # не больше пяти
+    with query_budget(exact=3): ...    # ровно три
+    При провале выводятся все запросы с местом вызова.
+    """
+    @contextmanager
+    def budget(maximum=None, exact=None):
+        log = QueryLog()
+        # Считаем запросы ко всем базам, включая реплику для чтения.
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(log))
+            yield log
+        if exact is not None:
+            assert len(log) == exact, (
+                f'Ожидалось {exact} запросов, выполнено {len(log)}:\n'
+                + log.report()
+            )
+        if maximum is not None:
+            assert len(log) <= maximum, (
+                f'Ожидалось не больше {maximum} запросов, '
+                f'выполнено {len(log)}:\n' + log.report()
+            )
+    return budget
+
+
+def reload_urls():
+    reload(news_urls)
+    reload(project_urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    """Подключаем асинхронные view, как это делает yanews/asgi.py."""
+    settings.NEWS_ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.NEWS_ASYNC_VIEWS = False
+    reload_urls()
+
+
 @pytest.fixture
 def author(django_user_model):
     """Создаем пользователя-автора."""
@@ -57,11 +179,13 @@ def news_list():
 @pytest.fixture
 def comment(author, news):
     """Создаем объект комментария."""
-    return Comment.objects.create(
+    comment = Comment.objects.create(
         news=news,
         author=author,
         text='Здесь написано что-то интересное!'
     )
+    News.objects.filter(pk=news.pk).change_comment_count(1)
+    return comment
 
 
 @pytest.fixture
@@ -78,6 +202,7 @@ def comment_list(author, news):
         comment.created = now + timedelta(days=index)
         comment.save()
         comment_list.append(comment)
+    News.objects.filter(pk=news.pk).change_comment_count(len(comment_list))
 
 
 @pytest.fixture
@@ -86,12 +211,48 @@ def home_url():
     return reverse('news:home')
 
 
+@pytest.fixture
+def archive_url():
+    """Архив новостей."""
+    return reverse('news:archive')
+
+
+@pytest.fixture
+def calendar_url():
+    """Навигация по архиву по датам."""
+    return reverse('news:calendar')
+
+
+@pytest.fixture
+def search_url():
+    """Поиск."""
+    return reverse('news:search')
+
+
 @pytest.fixture
 def detail_url(news):
     """Страница новости."""
     return reverse('news:detail', args=(news.id,))
 
 
+@pytest.fixture
+def comments_url(news):
+    """Фрагмент с комментариями."""
+    return reverse('news:comments', args=(news.id,))
+
+
+@pytest.fixture
+def feed_url():
+    """RSS последних новостей."""
+    return reverse('news:feed_rss')
+
+
+@pytest.fixture
+def comments_feed_url(news):
+    """Atom комментариев к новости."""
+    return reverse('news:comments_feed_atom', args=(news.id,))
+
+
 @pytest.fixture
 def delete_url(comment):
     """Удаление."""
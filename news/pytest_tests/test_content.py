@@ -1,6 +1,32 @@
+import asyncio
+from datetime import date
+import gzip
+from http import HTTPStatus
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+import pytest
 from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.templatetags.static import static
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
+from news import trending
+from news.cache import (
+    bump_version, fragment_key, fragment_version, get_or_build, news_scope,
+)
+from news.checks import check_shared_cache
 from news.forms import CommentForm
+from news.middleware import IMMUTABLE, StaticFilesMiddleware
+from news.live import LiveEvents, broker, news_channel
+from news.models import ArchivedComment, Comment, News
+from news.personal import personalize
 
 FORM = 'form'
 NEWS = 'news'
@@ -23,6 +49,581 @@ def test_sorted_news(client, news_list, home_url):
     assert all_dates == sorted_dates
 
 
+def test_archive_walks_all_news_by_cursor(client, news_list, archive_url):
+    """Архив отдаёт все новости по курсору без пропусков и повторов."""
+    seen = []
+    url = archive_url
+    while url:
+        response = client.get(url)
+        page = response.context['page']
+        assert len(page) <= settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+        seen.extend(news.pk for news in page)
+        url = page.next_cursor and f'{archive_url}?cursor={page.next_cursor}'
+    expected = News.objects.order_by('-date', '-id').values_list(
+        'pk', flat=True
+    )
+    assert seen == list(expected)
+    assert len(seen) == len(news_list)
+
+
+def test_empty_archive_page_keeps_archive_navigation(client):
+    """Пустая страница архива не подменяется ссылкой «Архив новостей»."""
+    url = reverse('news:archive_day', args=(2000, 1, 1))
+    content = client.get(url).content.decode()
+    assert reverse('news:archive') not in content
+
+
+def test_archive_rejects_broken_cursor(client, archive_url):
+    """Испорченный курсор даёт 404, а не ошибку сервера."""
+    response = client.get(archive_url, {'cursor': 'не-курсор'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_calendar_drills_down_to_day_archive(client, calendar_url):
+    """Календарь ведёт от года к дню и показывает счётчики из сводки."""
+    day = date(2020, 2, 29)
+    News.objects.create(title='Високосная', text='Текст.', date=day)
+    News.objects.create(title='Тоже', text='Текст.', date=day)
+    News.objects.create(title='Потом', text='Текст.', date=date(2021, 1, 1))
+    years = client.get(calendar_url).context['periods']
+    assert [(period['date'].year, period['news']) for period in years] == [
+        (2020, 2), (2021, 1),
+    ]
+    days = client.get(
+        reverse('news:calendar_month', args=(2020, 2))
+    ).context['periods']
+    assert [(period['date'], period['news']) for period in days] == [
+        (day, 2),
+    ]
+    response = client.get(reverse('news:archive_day', args=(2020, 2, 29)))
+    assert {news.title for news in response.context['page']} == {
+        'Високосная', 'Тоже',
+    }
+    response = client.get(reverse('news:calendar_month', args=(2020, 13)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_search_matches_word_forms_and_ranks_titles(client, search_url):
+    """Поиск понимает формы слов и ставит совпадение в заголовке выше."""
+    in_text = News.objects.create(
+        title='Погода', text='Синоптики обещают новые рекорды.'
+    )
+    in_title = News.objects.create(title='Рекорд недели', text='Подробности.')
+    News.objects.create(title='Другое', text='Ничего общего.')
+    response = client.get(search_url, {'q': 'рекордами'})
+    assert list(response.context['results']) == [in_title, in_text]
+
+
+def test_search_index_follows_changes(client, news, search_url):
+    """Триггеры обновляют индекс при правке и удалении новости."""
+    news.title = 'Выборы в парламент'
+    news.save()
+    response = client.get(search_url, {'q': 'выборах'})
+    assert list(response.context['results']) == [news]
+    news.delete()
+    response = client.get(search_url, {'q': 'выборах'})
+    assert list(response.context['results']) == []
+
+
+def test_admin_news_page_limits_comment_inline(
+        admin_client, news, comment_list, settings
+):
+    """Админка новости редактирует только последние комментарии."""
+    settings.ADMIN_INLINE_COMMENTS = 3
+    response = admin_client.get(
+        reverse('admin:news_news_change', args=(news.pk,))
+    )
+    formset = response.context['inline_admin_formsets'][0].formset
+    assert formset.initial_form_count() == 3
+    latest = news.comment_set.order_by('-created', '-id')[:3]
+    assert [form.instance for form in formset.forms] == list(latest)
+    assert f'news__id__exact={news.pk}' in response.content.decode()
+
+
+def test_admin_news_search_uses_index(admin_client, news_list):
+    """Поиск в списке новостей идёт по полнотекстовому индексу."""
+    found = News.objects.first()
+    found.title = 'Роботы в городе'
+    found.save()
+    response = admin_client.get(
+        reverse('admin:news_news_changelist'), {'q': 'робот'}
+    )
+    assert list(response.context['cl'].result_list) == [found]
+
+
+def test_collected_static_is_served_compressed(settings, tmp_path, rf):
+    """Собранная статика отдаётся сжатой и кешируется навсегда."""
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STATICFILES_STORAGE = (
+        'news.storage.CompressedManifestStaticFilesStorage'
+    )
+    call_command('collectstatic', interactive=False, verbosity=0)
+    name = 'vendor/bootstrap-5.1.3/bootstrap.min.css'
+    url = static(name)
+    assert url != settings.STATIC_URL + name
+    middleware = StaticFilesMiddleware(lambda request: None)
+    response = middleware(rf.get(url, HTTP_ACCEPT_ENCODING='gzip, br'))
+    body = b''.join(response.streaming_content)
+    assert response['Content-Encoding'] in ('gzip', 'br')
+    assert response['Cache-Control'] == IMMUTABLE
+    assert response['Vary'] == 'Accept-Encoding'
+    if response['Content-Encoding'] == 'gzip':
+        assert gzip.decompress(body).startswith(b'@charset')
+    response = middleware(rf.get(
+        url, HTTP_ACCEPT_ENCODING='identity',
+        HTTP_IF_NONE_MATCH=response['ETag'],
+    ))
+    assert response.status_code == HTTPStatus.OK
+    assert not response.has_header('Content-Encoding')
+    response = middleware(rf.get(url, HTTP_IF_NONE_MATCH=response['ETag']))
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def read_stream(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def test_api_streams_only_requested_fields(client, news_list):
+    """API отдаёт только запрошенные поля и не читает лишние колонки."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            reverse('news:api_news'), {'fields': 'id,title'}
+        )
+        data = json.loads(read_stream(response))
+    assert len(data['results']) == len(news_list)
+    assert data['next'] is None
+    assert set(data['results'][0]) == {'id', 'title'}
+    assert not any(
+        '"news_news"."text"' in query['sql']
+        for query in queries.captured_queries
+    )
+
+
+def test_api_ndjson_resumes_from_cursor(client, news, comment_list):
+    """NDJSON отдаётся порциями, курсор продолжает с места остановки."""
+    url = reverse('news:api_news_comments', args=(news.pk,))
+    params = {'format': 'ndjson', 'limit': 4, 'fields': 'id,author'}
+    ids = []
+    while True:
+        lines = read_stream(client.get(url, params)).splitlines()
+        rows = [json.loads(line) for line in lines]
+        ids.extend(row['id'] for row in rows if 'id' in row)
+        if 'next' not in rows[-1]:
+            break
+        params['cursor'] = rows[-1]['next']
+    assert ids == sorted(news.comment_set.values_list('id', flat=True))
+    assert rows[0]['author'] == 'Лев Толстой'
+
+
+def asgi_get(path, query=''):
+    """Запрос через ASGIHandler, как под uvicorn: (статус, тело)."""
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request'}
+
+    async def send(message):
+        messages.append(message)
+
+    # Как тестовый клиент: не закрываем соединение с тестовой транзакцией.
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        async_to_sync(ASGIHandler())(scope, receive, send)
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return messages[0]['status'], body.decode()
+
+
+def test_api_pages_under_asgi(author, news, comment, settings):
+    """Под ASGI API отдаёт страницы по курсору, включая архивную таблицу."""
+    settings.API_ASGI_PAGE_SIZE = 2
+    archived = News.objects.create(title='Старая', text='Текст.')
+    ArchivedComment.objects.bulk_create(
+        ArchivedComment(
+            id=comment.pk + index, news=archived, author=author,
+            text=f'Архив {index}', created=comment.created,
+            modified=comment.created,
+        )
+        for index in range(1, 3)
+    )
+    url = reverse('news:api_author_comments', args=(author.pk,))
+    status, body = asgi_get(url, 'fields=id,text')
+    assert status == HTTPStatus.OK
+    data = json.loads(body)
+    assert [row['text'] for row in data['results']] == [
+        comment.text, 'Архив 1'
+    ]
+    status, body = asgi_get(url, f'fields=id,text&cursor={data["next"]}')
+    data = json.loads(body)
+    assert [row['text'] for row in data['results']] == ['Архив 2']
+    assert data['next'] is None
+
+
+@pytest.mark.parametrize('name', ('user_box', 'unknown', 'comment_form'))
+def test_api_does_not_personalize_markers(client, name):
+    """Метки из запроса в JSON-ответе не подставляются и не ломают его."""
+    marker = f'<!--personal:{name}-->'
+    response = client.get(reverse('news:api_news'), {'fields': marker})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert marker in response.json()['error']
+
+
+def test_foreign_markers_are_left_as_is(rf):
+    """Неизвестная метка и метка с чужим числом аргументов не трогаются."""
+    content = '<!--personal:unknown--><!--personal:comment_form-->'
+    assert personalize(rf.get('/'), content) == content
+
+
+def test_comment_with_marker_keeps_api_working(author, news, settings):
+    """Текст комментария с меткой отдаётся под ASGI как есть."""
+    settings.API_ASGI_PAGE_SIZE = 10
+    text = '<!--personal:user_box--> и <!--personal:trending:1-->'
+    Comment.objects.create(news=news, author=author, text=text)
+    status, body = asgi_get(
+        reverse('news:api_news_comments', args=(news.pk,)), 'fields=text'
+    )
+    assert status == HTTPStatus.OK
+    assert json.loads(body)['results'] == [{'text': text}]
+
+
+def test_api_rejects_unknown_fields(client):
+    """Неизвестное поле — ошибка клиента, а не пустая выгрузка."""
+    response = client.get(reverse('news:api_news'), {'fields': 'password'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_metrics_endpoint_is_opt_in(client, news, home_url, settings):
+    """Метрики собираются всегда, а отдаются только если включены."""
+    metrics_url = reverse('news:metrics')
+    client.get(home_url)
+    assert client.get(metrics_url).status_code == HTTPStatus.NOT_FOUND
+    settings.METRICS_ENDPOINT_ENABLED = True
+    body = client.get(metrics_url).content.decode()
+    assert 'yanews_db_queries_count{view="news:home"}' in body
+    assert 'yanews_render_duration_seconds_sum{view="news:home"}' in body
+    assert 'yanews_response_size_bytes_bucket{view="news:home",le="+Inf"}' in (
+        body
+    )
+
+
+def test_home_page_uses_comment_counter(client, news, comment, home_url):
+    """Главная показывает счётчик, не обращаясь к таблице комментариев."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(home_url)
+    assert 'Комментариев: 1' in response.content.decode()
+    assert not any(
+        'news_comment' in query['sql'] for query in queries.captured_queries
+    )
+
+
+def test_cached_fragments_follow_changes(
+        author_client, news, comment, home_url, detail_url
+):
+    """Кешированные фрагменты обновляются после изменения комментариев."""
+    assert comment.text in author_client.get(detail_url).content.decode()
+    assert 'Комментариев: 1' in author_client.get(home_url).content.decode()
+    author_client.post(detail_url, data={'text': 'Свежий комментарий'})
+    assert 'Свежий комментарий' in (
+        author_client.get(detail_url).content.decode()
+    )
+    assert 'Комментариев: 2' in author_client.get(home_url).content.decode()
+
+
+def test_page_is_shared_between_users(
+        author_client, client, admin_client, author, comment, detail_url,
+        edit_url,
+):
+    """Страница собирается один раз, персональное подставляется каждому."""
+    with CaptureQueriesContext(connection) as first:
+        own = author_client.get(detail_url)
+    assert edit_url in own.content.decode()
+    assert f'Пользователь: {author.username}' in own.content.decode()
+    assert 'csrfmiddlewaretoken' in own.content.decode()
+    with CaptureQueriesContext(connection) as second:
+        other = admin_client.get(detail_url)
+    assert len(second) < len(first)
+    assert edit_url not in other.content.decode()
+    assert f'Пользователь: {author.username}' not in other.content.decode()
+    anonymous = client.get(detail_url).content.decode()
+    assert 'csrfmiddlewaretoken' not in anonymous
+    assert 'personal:' not in anonymous
+
+
+@pytest.mark.parametrize(
+    'url_fixture', ('home_url', 'detail_url', 'feed_url')
+)
+def test_unknown_params_share_cached_page(
+        request, client, monkeypatch, url_fixture
+):
+    """Посторонние параметры запроса не создают новых копий в кеше."""
+    url = request.getfixturevalue(url_fixture)
+    keys = []
+
+    def spy(key, version, build):
+        keys.append(key)
+        return get_or_build(key, version, build)
+    monkeypatch.setattr('news.personal.get_or_build', spy)
+    monkeypatch.setattr('news.feeds.get_or_build', spy)
+    client.get(url, {'utm_source': 'mail'})
+    client.get(url, {'utm_source': 'bot', 'x': '1'})
+    client.get(url)
+    assert len(keys) == 3 and len(set(keys)) == 1
+
+
+def test_stale_fragment_is_served_while_rebuilding():
+    """Пока фрагмент пересобирает другой воркер, отдаётся старая версия."""
+    key = fragment_key('test', 1)
+    assert get_or_build(key, 'v1', lambda: 'old') == 'old'
+    cache.add(f'{key}:lock', True)
+    assert get_or_build(key, 'v2', lambda: 'new') == 'old'
+    cache.delete(f'{key}:lock')
+    assert get_or_build(key, 'v2', lambda: 'new') == 'new'
+
+
+def test_version_bump_reaches_other_workers(monkeypatch, tmp_path):
+    """Сброс версии в одном воркере виден другому через общий кеш."""
+    workers = [
+        FileBasedCache(str(tmp_path), {}) for _ in range(2)
+    ]
+    key = fragment_key('test', 1)
+
+    def render(worker, text):
+        monkeypatch.setattr('news.cache.cache', worker)
+        return get_or_build(key, fragment_version(1), lambda: text)
+
+    assert render(workers[0], 'old') == 'old'
+    assert render(workers[1], 'new') == 'old'
+    monkeypatch.setattr('news.cache.cache', workers[0])
+    bump_version(news_scope(1))
+    assert render(workers[1], 'new') == 'new'
+
+
+def test_process_local_cache_is_reported(settings):
+    """Локальный кеш процесса без DEBUG — предупреждение при проверке."""
+    settings.DEBUG = False
+    assert check_shared_cache(None)[0].id == 'news.W001'
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/yanews',
+    }}
+    assert check_shared_cache(None) == []
+
+
+@pytest.mark.parametrize('url_fixture', ('home_url', 'detail_url'))
+def test_unchanged_page_is_not_modified(
+        request, author_client, comment, url_fixture
+):
+    """Повторный запрос с валидатором получает 304, пока нет изменений."""
+    url = request.getfixturevalue(url_fixture)
+    response = author_client.get(url)
+    assert response.has_header('ETag')
+    assert response.has_header('Last-Modified')
+    response = author_client.get(
+        url, HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_same_day_news_moves_feed_last_modified(client, news, feed_url):
+    """Новость с той же датой сдвигает Last-Modified ленты."""
+    last_modified = client.get(feed_url)['Last-Modified']
+    response = client.get(feed_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    News.objects.create(title='Ещё одна', text='Текст.', date=news.date)
+    response = client.get(feed_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Ещё одна' in response.content.decode()
+
+
+def test_comment_deletion_moves_comments_feed_last_modified(
+        client, author_client, comment, delete_url, comments_feed_url
+):
+    """Удаление комментария сдвигает Last-Modified ленты комментариев."""
+    last_modified = client.get(comments_feed_url)['Last-Modified']
+    author_client.post(delete_url)
+    response = client.get(
+        comments_feed_url, HTTP_IF_MODIFIED_SINCE=last_modified
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert comment.text not in response.content.decode()
+
+
+@pytest.mark.parametrize('url_fixture', ('home_url', 'detail_url'))
+def test_comment_edit_changes_validators(
+        request, author_client, comment, edit_url, url_fixture
+):
+    """Правка комментария меняет ETag, и страница отдаётся заново."""
+    url = request.getfixturevalue(url_fixture)
+    etag = author_client.get(url)['ETag']
+    author_client.post(edit_url, data={'text': 'Исправленный текст'})
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('url_fixture', ('home_url', 'detail_url'))
+@pytest.mark.parametrize('change', ('delete_comment', 'edit_news'))
+def test_changes_move_last_modified(
+        request, client, author_client, news, comment, delete_url,
+        url_fixture, change,
+):
+    """Удаление комментария и правка новости сдвигают Last-Modified."""
+    url = request.getfixturevalue(url_fixture)
+    last_modified = client.get(url)['Last-Modified']
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    if change == 'delete_comment':
+        author_client.post(delete_url)
+    else:
+        news.title = 'Исправленный заголовок'
+        news.save()
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == HTTPStatus.OK
+    assert response['Last-Modified'] != last_modified
+
+
+def test_trending_refresh_changes_feed_validators(
+        client, monkeypatch, news, home_url
+):
+    """Новый интервал рейтинга меняет ETag и Last-Modified ленты."""
+    first = client.get(home_url)
+    block_version = trending.block_version
+    monkeypatch.setattr(
+        'news.trending.block_version', lambda: block_version() + 1
+    )
+    response = client.get(
+        home_url, HTTP_IF_NONE_MATCH=first['ETag'],
+        HTTP_IF_MODIFIED_SINCE=first['Last-Modified'],
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != first['ETag']
+    response = client.get(
+        home_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_comments_feed_lists_latest_comments(
+        client, comment, comments_feed_url
+):
+    """В ленте комментариев — текст и ссылка на комментарий."""
+    content = client.get(comments_feed_url).content.decode()
+    assert comment.text in content
+    assert f'#comment-{comment.pk}' in content
+
+
+@pytest.mark.parametrize('url_fixture', ('feed_url', 'comments_feed_url'))
+def test_feed_poll_is_answered_from_cache(
+        request, client, author_client, news, detail_url, url_fixture
+):
+    """Повторный опрос ленты — 304 без запросов; новый комментарий — 200."""
+    url = request.getfixturevalue(url_fixture)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    etag = response['ETag']
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not queries.captured_queries
+    author_client.post(detail_url, data={'text': 'Свежий комментарий'})
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('url_fixture', ('home_url', 'detail_url'))
+def test_async_pages_support_conditional_get(
+        request, author_client, comment, url_fixture, async_views
+):
+    """Асинхронные view отдают валидаторы и отвечают 304 без новостей."""
+    url = request.getfixturevalue(url_fixture)
+    response = author_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.resolver_match.func.__module__ == 'news.async_views'
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not any(
+        'news_' in query['sql'] for query in queries.captured_queries
+    )
+
+
+def test_async_detail_has_comments_and_form(
+        author_client, comment, detail_url, async_views
+):
+    """Асинхронная страница новости показывает комментарии и форму."""
+    response = author_client.get(detail_url)
+    assert comment.text in response.content.decode()
+    assert isinstance(response.context[FORM], CommentForm)
+
+
+def test_live_events_push_comment_changes(
+        author, news, django_capture_on_commit_callbacks
+):
+    """Подписчик получает созданный, исправленный и удалённый комментарий."""
+    app = LiveEvents(None)
+    scope = {
+        'type': 'http', 'method': 'GET',
+        'path': reverse('news:events', args=(news.pk,)),
+    }
+    events = []
+    done = asyncio.Event()
+    requested = False
+
+    async def receive():
+        # Как uvicorn: сначала пустое тело GET, отключение — потом.
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        events.append(message.get('body', b'').decode())
+        if 'event: deleted' in events[-1]:
+            done.set()
+
+    def write():
+        with django_capture_on_commit_callbacks(execute=True):
+            comment = Comment.objects.create(
+                news=news, author=author, text='Первый!'
+            )
+            comment.text = 'Исправлено'
+            comment.save()
+            comment.delete()
+
+    async def run():
+        stream = asyncio.ensure_future(app(scope, receive, send))
+        while not broker.has_subscribers(news_channel(news.pk)):
+            assert not stream.done()
+            await asyncio.sleep(0.01)
+        await sync_to_async(write)()
+        await asyncio.wait_for(stream, 5)
+
+    async_to_sync(run)()
+    body = ''.join(events)
+    assert 'event: created' in body and 'Первый!' in body
+    assert 'event: edited' in body and 'Исправлено' in body
+    assert not broker.has_subscribers(news_channel(news.pk))
+
+
+def test_live_events_need_asgi(client, news):
+    """Без ASGI поток событий отвечает 204, и браузер не переподключается."""
+    response = client.get(reverse('news:events', args=(news.pk,)))
+    assert response.status_code == HTTPStatus.NO_CONTENT
+
+
 def test_comments_order(client, news, comment_list, detail_url):
     """Тест на правильную сортировку комментариев (от новых к старым)."""
     response = client.get(detail_url)
@@ -34,6 +635,25 @@ def test_comments_order(client, news, comment_list, detail_url):
     assert all_timestamps == sorted_timestamps
 
 
+def test_comments_are_loaded_in_chunks(
+        client, news, comment_list, detail_url, comments_url, settings
+):
+    """Комментарии отдаются порциями, фрагмент продолжает с курсора."""
+    settings.COMMENTS_COUNT_ON_DETAIL_PAGE = 3
+    response = client.get(detail_url)
+    page = response.context['comments']
+    seen = [comment.pk for comment in page]
+    assert len(seen) == 3
+    while page.has_next:
+        response = client.get(comments_url, {'cursor': page.next_cursor})
+        page = response.context['comments']
+        seen.extend(comment.pk for comment in page)
+    expected = news.comment_set.order_by('created', 'id').values_list(
+        'pk', flat=True
+    )
+    assert seen == list(expected)
+
+
 def test_anonymous_client_has_no_form(client, detail_url):
     """Аноним не имеет формы."""
     response = client.get(detail_url)
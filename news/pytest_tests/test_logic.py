@@ -1,10 +1,28 @@
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
 import random
 
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import pytest
 from pytest_django.asserts import assertRedirects, assertFormError
 
+from news import metrics, trending
+from news.auth import user_cache_key
+from news.db import REPLICA, PrimaryReplicaRouter
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.models import (
+    ArchivedComment, BadWord, Comment, DailyRollup, News, TrendingBucket,
+)
+from news.moderation import Automaton
+from news.warmup import warm_up
 
 NEW_COMMENT_TEXT = 'Новый текст'
 
@@ -29,6 +47,8 @@ def test_auth_user_can_create_comment(
     assert new_cmnt.text == NEW_COMMENT_TEXT
     assert new_cmnt.news == news
     assert new_cmnt.author == author
+    news.refresh_from_db()
+    assert news.comment_count == 1
 
 
 def test_user_cant_use_bad_words(author_client, detail_url):
@@ -46,6 +66,147 @@ def test_user_cant_use_bad_words(author_client, detail_url):
     assert comment_count_after == comment_count_before
 
 
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+        ('ushers', 'she'),
+        ('ahishers', 'his'),
+        ('nothing to see', None),
+        ('', None),
+    ),
+)
+def test_automaton_finds_first_word(text, expected):
+    """Автомат находит слово, заканчивающееся раньше других."""
+    automaton = Automaton(('he', 'she', 'his', 'hers'))
+    assert automaton.find(text) == expected
+
+
+@pytest.fixture
+def db_bad_word():
+    """Стоп-слово, добавленное модератором через базу."""
+    bad_word = BadWord.objects.create(word='Брокколи')
+    yield bad_word
+    bad_word.delete()
+
+
+def test_bad_words_from_db_are_applied(author_client, detail_url, db_bad_word):
+    """Слово из базы подхватывается без перезапуска."""
+    response = author_client.post(
+        detail_url, data={'text': 'Опять эта БРОККОЛИ!'}
+    )
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    error = response.context['form'].errors.as_data()['text'][0]
+    assert error.params == {'word': 'брокколи'}
+    assert not Comment.objects.exists()
+
+
+def test_archive_comments_moves_old_threads(
+    author_client, news, comment_list, detail_url
+):
+    """Старая ветка уходит в архив и остаётся видна, но закрыта."""
+    fresh = News.objects.create(title='Свежая', text='Текст')
+    News.objects.filter(pk=news.pk).update(
+        date=timezone.localdate() - timedelta(days=400)
+    )
+    call_command(
+        'archive_comments', batch_size=1,
+        stdout=StringIO(), stderr=StringIO(),
+    )
+    news.refresh_from_db()
+    fresh.refresh_from_db()
+    assert news.archived and not fresh.archived
+    assert not Comment.objects.filter(news=news).exists()
+    assert ArchivedComment.objects.filter(news=news).count() == 10
+    content = author_client.get(detail_url).content.decode()
+    assert 'Текст 9' in content
+    assert 'Обсуждение закрыто.' in content
+    assert 'Редактировать' not in content
+    response = author_client.get(reverse('news:comments', args=(news.pk,)))
+    assert 'Текст 0' in response.content.decode()
+    response = author_client.post(detail_url, data={'text': 'Поздно'})
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == 10
+
+
+def test_admin_cannot_comment_archived_news(admin_client, author, news):
+    """В админке комментарий к архивной новости не создаётся."""
+    News.objects.filter(pk=news.pk).update(archived=True)
+    response = admin_client.post(reverse('admin:news_comment_add'), {
+        'news': news.pk, 'author': author.pk, 'text': 'Поздно',
+    })
+    assert response.status_code == HTTPStatus.OK
+    assert 'Обсуждение закрыто' in response.content.decode()
+    assert not Comment.objects.exists()
+
+
+def test_scan_comments_checks_archive(author, news, comment):
+    """Стоп-слова ищутся и в архивной таблице."""
+    ArchivedComment.objects.create(
+        id=comment.pk + 1, news=news, author=author, text='Старая брань',
+        created=comment.created, modified=comment.created,
+    )
+    BadWord.objects.create(word='брань')
+    call_command(
+        'scan_comments', workers=1, stdout=StringIO(), stderr=StringIO(),
+    )
+    assert ArchivedComment.objects.get().flagged
+    assert not Comment.objects.filter(flagged=True).exists()
+
+
+def test_trending_follows_comments_without_reading_them(
+    client, author, news_list, home_url
+):
+    """Рейтинг считается по счётчикам и совпадает с пересборкой."""
+    first, second = News.objects.order_by('pk')[:2]
+    for news, count in ((first, 1), (second, 3)):
+        for index in range(count):
+            Comment.objects.create(news=news, author=author, text=f'{index}')
+    Comment.objects.filter(news=second).first().delete()
+    with CaptureQueriesContext(connection) as queries:
+        windows = trending.ranking()
+    assert all(
+        'news_comment' not in query['sql']
+        for query in queries.captured_queries
+    )
+    assert [
+        [(news.pk, count) for news, count in top] for _, top in windows
+    ] == [[(second.pk, 2), (first.pk, 1)]] * 2
+    incremental = set(TrendingBucket.objects.values_list(
+        'news_id', 'bucket', 'count'
+    ))
+    call_command('rebuild_trending', stdout=StringIO())
+    assert set(TrendingBucket.objects.values_list(
+        'news_id', 'bucket', 'count'
+    )) == incremental
+    assert 'Обсуждают за час' in client.get(home_url).content.decode()
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_scan_comments_flags_old_comments(
+    tmp_path, comment_list, workers
+):
+    """Новое стоп-слово находится в старых комментариях и в пуле."""
+    BadWord.objects.create(word='Текст 3')
+    checkpoint = tmp_path / 'scan.checkpoint'
+    call_command(
+        'scan_comments', workers=workers, chunk_size=3,
+        checkpoint=str(checkpoint), stdout=StringIO(), stderr=StringIO(),
+    )
+    assert list(
+        Comment.objects.filter(flagged=True).values_list('text', flat=True)
+    ) == ['Текст 3']
+    assert checkpoint.read_text() == str(Comment.objects.latest('pk').pk)
+    Comment.objects.update(flagged=False)
+    call_command(
+        'scan_comments', workers=1, checkpoint=str(checkpoint),
+        stdout=StringIO(), stderr=StringIO(),
+    )
+    assert not Comment.objects.filter(flagged=True).exists()
+
+
 def test_auth_user_can_edit_comment(
     author_client, comment, detail_url, edit_url
 ):
@@ -67,6 +228,152 @@ def test_auth_user_can_delete_comment(
     assert not Comment.objects.filter(id=comment.id).exists()
 
 
+def test_async_comment_submission(
+        author_client, client, author, news, detail_url, async_views
+):
+    """Асинхронная отправка комментария ведёт себя как синхронная."""
+    client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    assert not Comment.objects.exists()
+    response = author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    assertRedirects(response, detail_url + '#comments')
+    comment = Comment.objects.get()
+    assert (comment.news, comment.author) == (news, author)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    bad_words = {'text': f'Какой-то текст, {BAD_WORDS[0]}, ...'}
+    response = author_client.post(detail_url, data=bad_words)
+    assertFormError(response, form='form', field='text', errors=WARNING)
+
+
+def test_comment_count_follows_create_and_delete(
+        author_client, news, detail_url
+):
+    """Счётчик комментариев растёт при создании и падает при удалении."""
+    author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    news.refresh_from_db()
+    assert news.comment_count == 2
+    comment = Comment.objects.first()
+    author_client.delete(reverse('news:delete', args=(comment.id,)))
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_recount_comments_command(news, comment_list):
+    """Команда восстанавливает рассинхронизированный счётчик."""
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count()
+
+
+def rollups():
+    return list(DailyRollup.objects.filter(news_count__gt=0).values_list(
+        'day', 'news_count', 'comment_count'
+    ))
+
+
+def test_daily_rollup_follows_news_and_comments(
+        author_client, news, detail_url
+):
+    """Сводка по дням следует за новостями и комментариями без пересчёта."""
+    author_client.post(detail_url, data={'text': NEW_COMMENT_TEXT})
+    news.refresh_from_db()
+    assert rollups() == [(news.date, 1, 1)]
+    moved = news.date - timedelta(days=1)
+    news.date = moved
+    news.save()
+    assert rollups() == [(moved, 1, 1)]
+    incremental = rollups()
+    call_command('rebuild_rollups', stdout=StringIO())
+    assert rollups() == incremental
+    news.delete()
+    assert rollups() == []
+
+
+def write_lines(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    return str(path)
+
+
+def test_import_news_upserts_by_external_id(tmp_path):
+    """Повторный импорт обновляет новости, битые записи пропускаются."""
+    first = write_lines(tmp_path, 'first.ndjson', [
+        '{"external_id": "a", "title": "Первая", "text": "Текст"}',
+        '{"external_id": "b", "title": "", "text": "Нет заголовка"}',
+        'не json',
+        '{"external_id": "c", "title": "Третья", "text": "Текст",'
+        ' "date": "2020-01-02"}',
+    ])
+    errors = StringIO()
+    call_command(
+        'import_news', first, batch_size=2, stdout=StringIO(), stderr=errors
+    )
+    assert News.objects.count() == 2
+    assert 'Запись 2 пропущена' in errors.getvalue()
+    assert 'Запись 3 пропущена' in errors.getvalue()
+    second = write_lines(tmp_path, 'second.csv', [
+        'external_id,title,text,date',
+        'a,Обновлённая,Новый текст,2021-05-06',
+    ])
+    call_command('import_news', second, stdout=StringIO(), stderr=StringIO())
+    assert News.objects.count() == 2
+    news = News.objects.get(external_id='a')
+    assert (news.title, str(news.date)) == ('Обновлённая', '2021-05-06')
+
+
+def test_import_news_checks_value_types(tmp_path):
+    """Числа из NDJSON читаются как строки, прочие типы — ошибка записи."""
+    path = write_lines(tmp_path, 'typed.ndjson', [
+        '{"external_id": 42, "title": 123, "text": "Текст"}',
+        '{"title": ["список"], "text": "Текст"}',
+        '{"title": "Дата", "text": "Текст", "date": 2020}',
+        '{"title": "Текст", "text": {"html": "<p>"}}',
+    ])
+    errors = StringIO()
+    call_command('import_news', path, stdout=StringIO(), stderr=errors)
+    assert list(News.objects.values_list('external_id', 'title')) == [
+        ('42', '123')
+    ]
+    for number in (2, 3, 4):
+        assert f'Запись {number} пропущена' in errors.getvalue()
+
+
+def test_import_news_resumes_from_checkpoint(tmp_path):
+    """С контрольной точкой уже загруженные записи не повторяются."""
+    path = write_lines(tmp_path, 'news.ndjson', [
+        f'{{"title": "Новость {index}", "text": "Текст"}}'
+        for index in range(5)
+    ])
+    checkpoint = tmp_path / 'news.checkpoint'
+    checkpoint.write_text('3')
+    call_command(
+        'import_news', path, checkpoint=str(checkpoint),
+        stdout=StringIO(), stderr=StringIO(),
+    )
+    assert list(News.objects.values_list('title', flat=True).order_by(
+        'title'
+    )) == ['Новость 3', 'Новость 4']
+    assert checkpoint.read_text() == '5'
+
+
+def test_import_comments_updates_counter(tmp_path, news, author):
+    """Импорт комментариев увеличивает счётчик у новости."""
+    News.objects.filter(pk=news.pk).update(external_id='n1')
+    path = write_lines(tmp_path, 'comments.ndjson', [
+        f'{{"news_external_id": "n1", "author": "{author.username}",'
+        f' "text": "Отзыв {index}"}}'
+        for index in range(3)
+    ] + ['{"news_external_id": "нет", "author": "x", "text": "Мимо"}'])
+    call_command(
+        'import_news', path, kind='comments',
+        stdout=StringIO(), stderr=StringIO(),
+    )
+    news.refresh_from_db()
+    assert news.comment_count == 3 == Comment.objects.count()
+
+
 def test_auth_user_cant_edit_comment_of_another_user(
         author_client, comment, detail_url
 ):
@@ -97,3 +404,96 @@ def test_auth_user_cant_delete_comment_of_another_user(
     comment.refresh_from_db()
     assert comment.text == 'Здесь написано что-то интересное!'
     assert comment.author == comment.author
+
+
+def test_router_reads_from_replica_outside_transaction(monkeypatch):
+    """Чтение идёт в реплику, но не внутри транзакции на default."""
+    router = PrimaryReplicaRouter()
+    assert router.db_for_read(News) == 'default'
+    monkeypatch.setattr(connections['default'], 'in_atomic_block', False)
+    assert router.db_for_read(News) == REPLICA
+    assert router.db_for_write(News) == 'default'
+    assert not router.allow_migrate(REPLICA, 'news')
+
+
+def test_sqlite_pragmas_applied(settings):
+    """При открытии соединения выполняются PRAGMA из настроек."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA busy_timeout')
+        assert cursor.fetchone()[0] == settings.SQLITE_PRAGMAS['busy_timeout']
+
+
+def test_purge_sessions_deletes_only_expired():
+    """Истёкшие сессии удаляются пачками, живые остаются."""
+    now = timezone.now()
+    Session.objects.bulk_create(
+        Session(
+            session_key=f'key{index}', session_data='',
+            expire_date=now + timedelta(days=1 if index % 2 else -1),
+        )
+        for index in range(5)
+    )
+    call_command('purge_sessions', batch_size=2, stdout=StringIO())
+    assert set(Session.objects.values_list('pk', flat=True)) == {
+        'key1', 'key3',
+    }
+
+
+def test_session_and_user_come_from_cache(
+        shared_cache, author_client, author, home_url
+):
+    """Повторный запрос не читает сессию и пользователя из базы."""
+    author_client.get(home_url)
+    with CaptureQueriesContext(connection) as queries:
+        author_client.get(home_url)
+    tables = ' '.join(query['sql'] for query in queries.captured_queries)
+    assert 'django_session' not in tables
+    assert 'auth_user' not in tables
+    author.username = 'Переименованный'
+    author.save()
+    assert 'Переименованный' in author_client.get(home_url).content.decode()
+
+
+def test_process_local_cache_keeps_auth_in_database(
+        settings, author_client, author, home_url
+):
+    """С кешем процесса сессия и пользователь читаются из базы."""
+    assert settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db'
+    author_client.get(home_url)
+    with CaptureQueriesContext(connection) as queries:
+        author_client.get(home_url)
+    tables = ' '.join(query['sql'] for query in queries.captured_queries)
+    assert 'django_session' in tables
+    assert 'auth_user' in tables
+    assert cache.get(user_cache_key(author.pk)) is None
+
+
+def test_model_backend_sessions_still_resolve(client, author, home_url):
+    """Сессии, выданные ModelBackend до кеширования, остаются рабочими."""
+    client.force_login(
+        author, backend='django.contrib.auth.backends.ModelBackend'
+    )
+    response = client.get(home_url)
+    assert f'Пользователь: {author.username}' in response.content.decode()
+
+
+def test_warm_up_compiles_templates_and_reports_timings(settings):
+    """Прогрев кладёт шаблоны в кеш загрузчика и пишет время в метрики."""
+    template_settings = dict(settings.TEMPLATES[0])
+    template_settings['OPTIONS'] = {
+        **template_settings['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            settings.TEMPLATE_LOADERS,
+        )],
+    }
+    settings.TEMPLATES = [template_settings]
+    counts = warm_up()
+    loader = engines['django'].engine.template_loaders[0]
+    assert counts['templates'] > 0 and counts['patterns'] > 0
+    assert 'news/home.html' in {
+        key.split('-')[0] for key in loader.get_template_cache
+    }
+    assert 'yanews_worker_boot_seconds{stage="templates"}' in (
+        metrics.render_prometheus()
+    )
@@ -0,0 +1,83 @@
+import pytest
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from news.models import Comment, News
+
+SMALL_SIZE = 2
+LARGE_SIZE = 12
+
+
+@pytest.fixture
+def grow(author, news, django_user_model):
+    """Добавляем новости и комментарии разных авторов к новости."""
+    def grow(count):
+        first = django_user_model.objects.count()
+        for index in range(first, first + count):
+            reader = django_user_model.objects.create(
+                username=f'Читатель {index}'
+            )
+            for user in (reader, author):
+                Comment.objects.create(
+                    news=news, author=user, text=f'Комментарий {index}'
+                )
+            News.objects.create(title=f'Новость {index}', text='Текст.')
+        News.objects.filter(pk=news.pk).change_comment_count(2 * count)
+    return grow
+
+
+@pytest.fixture
+def api_news_url():
+    return reverse('news:api_news')
+
+
+@pytest.fixture
+def api_comments_url(news):
+    return reverse('news:api_news_comments', args=(news.id,))
+
+
+@pytest.mark.parametrize(
+    'url_fixture, client_fixture, params, budget',
+    (
+        ('home_url', 'client', {}, 5),
+        ('home_url', 'author_client', {}, 7),
+        ('archive_url', 'client', {}, 5),
+        ('calendar_url', 'client', {}, 1),
+        ('search_url', 'client', {'q': 'новость'}, 3),
+        ('detail_url', 'client', {}, 4),
+        ('detail_url', 'author_client', {}, 6),
+        ('comments_url', 'client', {}, 1),
+        ('feed_url', 'client', {}, 1),
+        ('comments_feed_url', 'client', {}, 2),
+        ('edit_url', 'author_client', {}, 3),
+        ('delete_url', 'author_client', {}, 3),
+        ('api_news_url', 'client', {}, 1),
+        ('api_comments_url', 'client', {'fields': 'id,author'}, 1),
+    ),
+)
+def test_query_count_does_not_grow_with_data(
+    request, query_budget, grow, url_fixture, client_fixture, params, budget
+):
+    """Число запросов в пределах бюджета и не зависит от объёма данных."""
+    url = request.getfixturevalue(url_fixture)
+    client = request.getfixturevalue(client_fixture)
+    counts = []
+    for size in (SMALL_SIZE, LARGE_SIZE):
+        grow(size)
+        cache.clear()
+        with query_budget(budget) as log:
+            response = client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        counts.append(len(log))
+    assert counts[0] == counts[1], (
+        f'Запросов стало {counts[1]} вместо {counts[0]}:\n' + log.report()
+    )
+
+
+@pytest.mark.django_db(databases=('default', 'replica'))
+def test_budget_counts_replica_queries(query_budget):
+    """Запросы к реплике для чтения тоже входят в бюджет."""
+    with query_budget(exact=1):
+        list(News.objects.using('replica').all())
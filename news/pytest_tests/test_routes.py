@@ -9,7 +9,13 @@ from pytest_django.asserts import assertRedirects
     'url_fixture, client_fixture, expected_status',
     (
         ('home_url', 'client', HTTPStatus.OK),
+        ('archive_url', 'client', HTTPStatus.OK),
+        ('calendar_url', 'client', HTTPStatus.OK),
+        ('search_url', 'client', HTTPStatus.OK),
         ('detail_url', 'client', HTTPStatus.OK),
+        ('comments_url', 'client', HTTPStatus.OK),
+        ('feed_url', 'client', HTTPStatus.OK),
+        ('comments_feed_url', 'client', HTTPStatus.OK),
         ('login_url', 'client', HTTPStatus.OK),
         ('logout_url', 'client', HTTPStatus.OK),
         ('signup_url', 'client', HTTPStatus.OK),
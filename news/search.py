@@ -0,0 +1,165 @@
+"""Полнотекстовый поиск по новостям на SQLite FTS5.
+
+Индекс news_news_fts хранит заголовок и текст новости, приведённые к
+основам слов русским стеммером Snowball. Синхронизацию делают триггеры
+на news_news; стеммер доступен им как SQL-функция ru_stem, которую мы
+регистрируем на каждом соединении с SQLite.
+"""
+import re
+import threading
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .models import News
+
+try:
+    import snowballstemmer
+except ImportError:  # pragma: no cover
+    snowballstemmer = None
+
+FTS_TABLE = 'news_news_fts'
+# Совпадение в заголовке весит больше, чем в тексте.
+RANK = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+WORD_RE = re.compile(r'\w+')
+
+_local = threading.local()
+
+
+def _stem_words(words):
+    if snowballstemmer is None:
+        return words
+    if not hasattr(_local, 'stemmer'):
+        _local.stemmer = snowballstemmer.stemmer('russian')
+    return _local.stemmer.stemWords(words)
+
+
+def stem_text(text):
+    """Текст в виде основ слов через пробел."""
+    if not text:
+        return ''
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return ' '.join(_stem_words(words))
+
+
+def register_functions(connection):
+    """Даём SQLite-соединению функцию ru_stem для триггеров индекса."""
+    if connection.vendor != 'sqlite' or connection.connection is None:
+        return
+    connection.connection.create_function(
+        'ru_stem', 1, stem_text, deterministic=True
+    )
+
+
+def create_triggers(schema_editor):
+    """
+    Триггеры синхронизации индекса.
+
+    SQLite теряет их, когда миграция пересоздаёт таблицу news_news,
+    поэтому такие миграции должны вызвать эту функцию повторно.
+    """
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+        f'AFTER INSERT ON news_news BEGIN '
+        f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+        f'VALUES (new.id, ru_stem(new.title), ru_stem(new.text)); END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+        f'AFTER UPDATE OF title, text ON news_news BEGIN '
+        f'UPDATE {FTS_TABLE} SET title = ru_stem(new.title), '
+        f'text = ru_stem(new.text) WHERE rowid = new.id; END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+        f'AFTER DELETE ON news_news BEGIN '
+        f'DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END'
+    )
+
+
+def create_index(schema_editor):
+    """Создаём индекс, триггеры и заполняем индекс текущими новостями."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    register_functions(schema_editor.connection)
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+        f'USING fts5(title, text)'
+    )
+    create_triggers(schema_editor)
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+        f'SELECT id, ru_stem(title), ru_stem(text) FROM news_news'
+    )
+
+
+def drop_index(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for action in ('insert', 'update', 'delete'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{action}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def build_match(query):
+    """Запрос пользователя в выражение MATCH: все слова, по префиксу."""
+    return ' '.join(f'"{word}"*' for word in stem_text(query).split())
+
+
+def filter_news(queryset, query):
+    """Оставляем в queryset новости, найденные индексом (без ранжирования)."""
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match],
+    ))
+
+
+class SearchResults:
+    """
+    Ранжированная выдача, совместимая с django.core.paginator.Paginator.
+
+    Срез выбирает из индекса только id нужной страницы, а новости
+    подгружаются одним запросом по первичному ключу.
+    """
+
+    def __init__(self, query):
+        self.match = build_match(query)
+        self.connection = connections[News.objects.db]
+
+    def count(self):
+        if not self.match:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def ids(self, limit=-1, offset=0):
+        if not self.match:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY {RANK} '
+                f'LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        limit = -1 if item.stop is None else max(item.stop - start, 0)
+        ids = self.ids(limit, start)
+        news = News.objects.in_bulk(ids)
+        return [news[pk] for pk in ids if pk in news]
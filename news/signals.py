@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import metrics, trending
+from .auth import forget_user
+from .cache import FEED_SCOPE, invalidate, news_scope
+from .db import apply_pragmas
+from .live import publish_comment, publish_deletion
+from .models import BadWord, Comment, DailyRollup, News, as_day
+from .moderation import matcher
+from .search import register_functions
+
+
+@receiver(connection_created)
+def setup_connection(connection, **kwargs):
+    """PRAGMA, SQL-функции для триггеров поиска и учёт запросов."""
+    apply_pragmas(connection)
+    register_functions(connection)
+    metrics.install(connection)
+
+
+@receiver((post_save, post_delete), sender=BadWord)
+def reload_bad_words(**kwargs):
+    """Список стоп-слов изменился: пересобираем автомат."""
+    matcher.invalidate()
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news(instance, **kwargs):
+    """Новость изменилась: её фрагменты и валидаторы ленты устарели."""
+    invalidate(FEED_SCOPE, news_scope(instance.pk))
+
+
+@receiver(pre_save, sender=News)
+def remember_news_day(instance, **kwargs):
+    """Запоминаем прежние дату и счётчик, чтобы перенести их в сводке."""
+    instance._rollup_previous = None
+    if not instance._state.adding:
+        instance._rollup_previous = News.objects.filter(
+            pk=instance.pk
+        ).values_list('date', 'comment_count').first()
+
+
+@receiver(post_save, sender=News)
+def rollup_news_saved(instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    day = as_day(instance.date)
+    if previous is not None and previous[0] == day:
+        return
+    comments = instance.comment_count
+    if previous is not None:
+        comments = previous[1]
+        DailyRollup.objects.add(previous[0], news=-1, comments=-comments)
+    DailyRollup.objects.add(day, news=1, comments=comments)
+
+
+@receiver(post_delete, sender=News)
+def rollup_news_deleted(instance, **kwargs):
+    DailyRollup.objects.add(
+        as_day(instance.date), news=-1, comments=-instance.comment_count
+    )
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_news(instance, **kwargs):
+    """Комментарий изменился: устарели фрагменты его новости и ленты."""
+    invalidate(FEED_SCOPE, news_scope(instance.news_id))
+
+
+@receiver(post_save, sender=Comment)
+def count_trending_comment(instance, created, **kwargs):
+    if created:
+        trending.record(instance.news_id, instance.created, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_trending_comment(instance, **kwargs):
+    trending.record(instance.news_id, instance.created, -1)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_saved(instance, created, **kwargs):
+    """Новый или исправленный комментарий — подписчикам живой ленты."""
+    publish_comment('created' if created else 'edited', instance)
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_deleted(instance, **kwargs):
+    publish_deletion(instance)
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(instance, **kwargs):
+    """Пользователь изменился (пароль, last_login, права): сбрасываем кеш."""
+    forget_user(instance.pk)
@@ -0,0 +1,51 @@
+"""Хранилище статики: имена с хешем и заранее сжатые копии файлов.
+
+collectstatic кладёт рядом с каждым файлом с хешем в имени его версии
+.gz и, если установлен пакет brotli, .br. Сжимаются только текстовые
+форматы и только если копия действительно меньше оригинала.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.map', '.txt', '.json', '.html')
+
+
+def compressors():
+    """Расширение копии -> функция сжатия, в порядке предпочтения."""
+    available = {}
+    if brotli is not None:
+        available['.br'] = lambda data: brotli.compress(data, quality=11)
+    available['.gz'] = lambda data: gzip.compress(data, 9, mtime=0)
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < settings.STATIC_COMPRESS_MIN_SIZE:
+            return
+        for suffix, compress in compressors().items():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
@@ -0,0 +1,62 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from news.cache import fragment_key, fragment_version, get_or_build
+from news.personal import marker
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+
+    def __init__(self, nodelist, name, news_pk, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.news_pk = news_pk
+        self.vary_on = vary_on
+
+    def render(self, context):
+        news_pk = self.news_pk.resolve(context)
+        key = fragment_key(
+            self.name.resolve(context),
+            news_pk,
+            [var.resolve(context) for var in self.vary_on],
+        )
+        return get_or_build(
+            key,
+            fragment_version(news_pk),
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Кеширует фрагмент, привязанный к версии новости.
+
+    {% cachedfragment "имя" news.pk [vary_on ...] %} ...
+    {% endcachedfragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя фрагмента и id новости.'
+        )
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
+
+
+@register.simple_tag
+def personal(name, *args):
+    """
+    Метка персональной вставки в общей странице.
+
+    {% personal "comment_controls" comment.pk comment.author_id %}
+    """
+    return mark_safe(marker(name, *args))
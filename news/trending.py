@@ -0,0 +1,142 @@
+"""Самые обсуждаемые новости за последний час и сутки.
+
+Время делится на интервалы по TRENDING_BUCKET_SECONDS. Сигналы
+комментариев сдвигают счётчик «новость × интервал» в TrendingBucket;
+таблицу Comment рейтинг не читает. Закрытые интервалы неизменны, поэтому
+лежат в кеше кольцом из слотов (номер интервала по модулю длины самого
+длинного окна) и читаются из базы один раз. Сам рейтинг пересчитывается
+не чаще раза в TRENDING_REFRESH секунд, а вставка на главной подставляет
+готовый HTML, как персональные вставки.
+"""
+import heapq
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import get_or_build
+from .models import News, TrendingBucket
+from .personal import part
+
+
+def bucket_of(moment):
+    return int(moment.timestamp()) // settings.TRENDING_BUCKET_SECONDS
+
+
+def ring_size():
+    """Слотов в кольце: столько интервалов в самом длинном окне."""
+    longest = max(seconds for _, seconds in settings.TRENDING_WINDOWS)
+    return -(-longest // settings.TRENDING_BUCKET_SECONDS)
+
+
+def _slot_key(bucket):
+    return f'trending:slot:{bucket % ring_size()}'
+
+
+def forget_slot(bucket):
+    """Сбрасываем слот сейчас и после коммита, как и версии фрагментов."""
+    key = _slot_key(bucket)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def record(news_pk, moment, delta):
+    """Комментарий создан (delta > 0) или удалён (delta < 0) в moment."""
+    bucket = bucket_of(moment)
+    if bucket <= bucket_of(timezone.now()) - ring_size():
+        return
+    TrendingBucket.objects.add(news_pk, bucket, delta)
+    forget_slot(bucket)
+
+
+def _load(buckets):
+    """Счётчики интервалов из базы одним запросом по диапазону."""
+    loaded = {bucket: Counter() for bucket in buckets}
+    if buckets:
+        for bucket, news_pk, count in TrendingBucket.objects.filter(
+            bucket__gte=min(buckets), bucket__lte=max(buckets),
+        ).values_list('bucket', 'news_id', 'count'):
+            if bucket in loaded and count:
+                loaded[bucket][news_pk] += count
+    return loaded
+
+
+def buckets(current):
+    """Счётчики по новостям для каждого интервала кольца до current."""
+    closed = range(current - ring_size() + 1, current)
+    slots = cache.get_many([_slot_key(bucket) for bucket in closed])
+    found = {}
+    missing = []
+    for bucket in closed:
+        slot = slots.get(_slot_key(bucket))
+        if slot is not None and slot[0] == bucket:
+            found[bucket] = slot[1]
+        else:
+            missing.append(bucket)
+    loaded = _load([*missing, current])
+    cache.set_many(
+        {
+            _slot_key(bucket): (bucket, dict(loaded[bucket]))
+            for bucket in missing
+        },
+        ring_size() * settings.TRENDING_BUCKET_SECONDS,
+    )
+    found.update(loaded)
+    return found
+
+
+def ranking():
+    """[(название окна, [(новость, комментариев), ...]), ...]."""
+    current = bucket_of(timezone.now())
+    by_bucket = buckets(current)
+    windows = []
+    for title, seconds in settings.TRENDING_WINDOWS:
+        first = current - -(-seconds // settings.TRENDING_BUCKET_SECONDS) + 1
+        totals = Counter()
+        for bucket, counter in by_bucket.items():
+            if bucket >= first:
+                totals.update(counter)
+        top = heapq.nlargest(
+            settings.TRENDING_SIZE,
+            ((count, pk) for pk, count in totals.items() if count > 0),
+        )
+        windows.append((title, top))
+    news = News.objects.only('pk', 'title').in_bulk(
+        {pk for _, top in windows for _, pk in top}
+    )
+    return [
+        (title, [(news[pk], count) for count, pk in top if pk in news])
+        for title, top in windows
+    ]
+
+
+def block_version():
+    """Номер интервала TRENDING_REFRESH: блок собирается раз в интервал."""
+    return int(timezone.now().timestamp()) // settings.TRENDING_REFRESH
+
+
+@part('trending')
+def trending(request):
+    """Готовый блок рейтинга; собирается раз в TRENDING_REFRESH секунд."""
+    version = block_version()
+    return get_or_build('trending:block', version, lambda: render_to_string(
+        'includes/trending.html', {'windows': ranking()}
+    ))
+
+
+def rebuild():
+    """Пересобираем счётчики по Comment и удаляем устаревшие интервалы."""
+    first = bucket_of(timezone.now()) - ring_size() + 1
+    since = datetime.fromtimestamp(
+        first * settings.TRENDING_BUCKET_SECONDS, tz=dt_timezone.utc
+    )
+    pruned, _ = TrendingBucket.objects.filter(bucket__lt=first).delete()
+    rows = TrendingBucket.objects.rebuild(since, bucket_of)
+    cache.delete_many([_slot_key(bucket) for bucket in range(
+        first, first + ring_size() + 1
+    )])
+    return rows, pruned
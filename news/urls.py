@@ -1,16 +1,81 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import api, async_views, feeds, views
 
 app_name = 'news'
 
+if settings.NEWS_ASYNC_VIEWS:
+    home_view = async_views.news_list
+    detail_view = async_views.news_detail
+else:
+    home_view = views.NewsList.as_view()
+    detail_view = views.NewsDetailView.as_view()
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', home_view, name='home'),
+    path(
+        'archive/',
+        views.NewsList.as_view(archive=True),
+        name='archive'
+    ),
+    path(
+        'archive/<int:year>/<int:month>/<int:day>/',
+        views.NewsList.as_view(archive=True),
+        name='archive_day'
+    ),
+    path('calendar/', views.NewsCalendar.as_view(), name='calendar'),
+    path(
+        'calendar/<int:year>/',
+        views.NewsCalendar.as_view(),
+        name='calendar_year'
+    ),
+    path(
+        'calendar/<int:year>/<int:month>/',
+        views.NewsCalendar.as_view(),
+        name='calendar_month'
+    ),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('feed/rss/', feeds.latest_news_rss, name='feed_rss'),
+    path('feed/atom/', feeds.latest_news_atom, name='feed_atom'),
+    path('news/<int:pk>/', detail_view, name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
+    # Под ASGI этот адрес перехватывает news.live.LiveEvents.
+    path(
+        'news/<int:pk>/events/',
+        views.NewsEvents.as_view(),
+        name='events'
+    ),
+    path(
+        'news/<int:pk>/feed/rss/',
+        feeds.news_comments_rss,
+        name='comments_feed_rss'
+    ),
+    path(
+        'news/<int:pk>/feed/atom/',
+        feeds.news_comments_atom,
+        name='comments_feed_atom'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path('metrics/', views.Metrics.as_view(), name='metrics'),
+    path('api/news/', api.NewsStream.as_view(), name='api_news'),
+    path(
+        'api/news/<int:pk>/comments/',
+        api.CommentStream.as_view(lookup='news_id'),
+        name='api_news_comments'
+    ),
+    path(
+        'api/users/<int:pk>/comments/',
+        api.CommentStream.as_view(lookup='author_id'),
+        name='api_author_comments'
+    ),
 ]
@@ -1,48 +1,236 @@
+from datetime import date
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
 
+from . import conditional, metrics
+from .cache import feed_version, fragment_version
 from .forms import CommentForm
-from .models import Comment, News
+from .models import ArchivedComment, Comment, DailyRollup, News, as_day
+from .pagination import KeysetPage
+from .personal import render_shared
+from .search import SearchResults
+
+
+def comments_page(news_pk, cursor=None, model=None):
+    """
+    Порция комментариев к новости по индексу (news, created, id).
+
+    model — Comment или ArchivedComment (News.comment_model). Если
+    таблица неизвестна, сначала читаем рабочую: ветка уходит в архив
+    целиком, так что пустая страница в ней означает архивную новость
+    (или конец ветки, и тогда пуст и архив).
+    """
+    def page(model):
+        return KeysetPage(
+            model.objects.filter(news_id=news_pk).select_related('author'),
+            ('created', 'id'),
+            settings.COMMENTS_COUNT_ON_DETAIL_PAGE,
+            cursor,
+        )
+    if model is not None:
+        return page(model)
+    return page(Comment) or page(ArchivedComment)
+
+
+def check_open(news):
+    """В архивной новости обсуждение закрыто."""
+    if news.archived:
+        raise PermissionDenied('Обсуждение закрыто.')
+
+
+def save_comment(form, news, author):
+    """Сохраняем комментарий из формы и увеличиваем счётчик новости."""
+    comment = form.save(commit=False)
+    comment.news = news
+    comment.author = author
+    with transaction.atomic():
+        comment.save()
+        News.objects.filter(pk=news.pk).change_comment_count(1)
+    return comment
 
 
+@method_decorator(
+    condition(
+        etag_func=conditional.feed_etag,
+        last_modified_func=conditional.feed_last_modified,
+    ),
+    name='get',
+)
 class NewsList(generic.ListView):
-    """Список новостей."""
+    """
+    Список новостей.
+
+    В режиме архива (archive=True) лента листается курсором по (date, id).
+    """
     model = News
     template_name = 'news/home.html'
     context_object_name = 'news_feed'
+    archive = False
+    archive_ordering = ('-date', '-id')
 
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Число комментариев берём из денормализованного счётчика,
+        таблицу комментариев не трогаем.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        if self.archive:
+            return self.get_archive_page()
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+    def get_archive_day(self):
+        """День из адреса архива за дату или None для всего архива."""
+        if 'day' not in self.kwargs:
+            return None
+        try:
+            return date(
+                self.kwargs['year'], self.kwargs['month'], self.kwargs['day']
+            )
+        except ValueError:
+            raise Http404('Некорректная дата.')
+
+    def get_archive_page(self):
+        queryset = self.model.objects.all()
+        day = self.get_archive_day()
+        if day is not None:
+            queryset = queryset.filter(date=day)
+        try:
+            self.page = KeysetPage(
+                queryset,
+                self.archive_ordering,
+                settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+                self.request.GET.get('cursor'),
+            )
+        except ValueError:
+            raise Http404('Некорректный курсор.')
+        return self.page
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.archive:
+            context['page'] = self.page
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        """Лента одна на всех: персональное подставит middleware."""
+        return HttpResponse(render_shared(
+            self.request, self.get_template_names(), context,
+            'feed', feed_version(),
+        ))
+
+
+class NewsCalendar(generic.TemplateView):
+    """
+    Навигация по архиву: годы, месяцы года или дни месяца.
+
+    Счётчики берутся из DailyRollup, таблицы новостей и комментариев
+    не читаются.
+    """
+    template_name = 'news/calendar.html'
+
+    def get_context_data(self, year=None, month=None, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            periods = list(DailyRollup.objects.periods(year, month))
+        except ValueError:
+            raise Http404('Некорректная дата.')
+        if year is None:
+            level = 'year'
+        elif month is None:
+            level = 'month'
+        else:
+            level = 'day'
+        context.update(
+            year=year,
+            month=month and date(year, month, 1),
+            level=level,
+            periods=[
+                {'date': as_day(period), 'news': news, 'comments': comments}
+                for period, news, comments in periods
+            ],
+        )
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """Поиск по новостям с ранжированием по релевантности."""
+    template_name = 'news/search.html'
+    context_object_name = 'results'
+
+    def get_paginate_by(self, queryset):
+        return settings.NEWS_COUNT_ON_SEARCH_PAGE
+
+    def get_queryset(self):
+        return SearchResults(self.get_query())
+
+    def get_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.get_query()
+        return context
 
 
 class NewsDetail(generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_context_data(self, **kwargs):
+        """Комментарии отдаём первой страницей, остальные догружаются."""
+        context = super().get_context_data(**kwargs)
+        context['comments'] = comments_page(
+            self.object.pk, model=self.object.comment_model
         )
-        return obj
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        """Страница одна на всех; форму и свои ссылки подставит middleware."""
+        return HttpResponse(render_shared(
+            self.request, self.get_template_names(), context,
+            self.object.pk, fragment_version(self.object.pk),
+        ))
+
+
+class NewsComments(generic.TemplateView):
+    """Фрагмент со следующей порцией комментариев к новости."""
+    template_name = 'news/comments.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
-            context['form'] = CommentForm()
+        try:
+            context['comments'] = comments_page(
+                self.kwargs['pk'], self.request.GET.get('cursor')
+            )
+        except ValueError:
+            raise Http404('Некорректный курсор.')
+        context['news_pk'] = self.kwargs['pk']
         return context
 
 
+class NewsEvents(generic.View):
+    """
+    Поток событий без ASGI недоступен.
+
+    Под ASGI запрос обслуживает news.live.LiveEvents; здесь отвечаем
+    204, и EventSource в браузере больше не переподключается.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+
 class NewsComment(
         LoginRequiredMixin,
         generic.detail.SingleObjectMixin,
@@ -54,22 +242,35 @@ class NewsComment(
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
+        check_open(self.object)
         return super().post(request, *args, **kwargs)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = comments_page(self.object.pk, model=Comment)
+        return context
+
     def form_valid(self, form):
-        comment = form.save(commit=False)
-        comment.news = self.object
-        comment.author = self.request.user
-        comment.save()
+        save_comment(form, self.object, self.request.user)
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        # Форму с ошибками подставит вставка comment_form.
+        self.request.comment_form = form
+        return super().form_invalid(form)
+
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
 
+    @method_decorator(condition(
+        etag_func=conditional.news_etag,
+        last_modified_func=conditional.news_last_modified,
+    ))
     def get(self, request, *args, **kwargs):
         view = NewsDetail.as_view()
         return view(request, *args, **kwargs)
@@ -84,14 +285,15 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -103,3 +305,27 @@ class CommentUpdate(CommentBase, generic.UpdateView):
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        """Удаляем комментарий и уменьшаем счётчик у новости."""
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            deleted, _ = self.object.delete()
+            if deleted:
+                News.objects.filter(
+                    pk=self.object.news_id
+                ).change_comment_count(-1)
+        return HttpResponseRedirect(success_url)
+
+
+class Metrics(generic.View):
+    """Метрики производительности для Prometheus (включаются в настройках)."""
+
+    def get(self, request, *args, **kwargs):
+        if not settings.METRICS_ENDPOINT_ENABLED:
+            raise Http404
+        return HttpResponse(
+            metrics.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -0,0 +1,109 @@
+"""Прогрев воркера до первого запроса.
+
+Всё, что Django обычно делает лениво на первом запросе, делаем при
+старте: компилируем шаблоны проекта в кеш загрузчика, строим
+URL-резолверы и их регулярные выражения, вычисляем ленивые адреса из
+настроек и загружаем каталог переводов. Время этапов попадает в
+метрики (yanews_worker_boot_seconds) и в лог.
+"""
+import logging
+import os
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+from django.utils import formats, timezone, translation
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def timed(stage):
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.BOOT_TIMINGS[stage] = perf_counter() - started
+
+
+def project_templates(directory):
+    """Имена всех шаблонов в каталоге, относительно него."""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.html', '.txt', '.xml')):
+                path = os.path.join(os.path.relpath(root, directory), name)
+                yield os.path.normpath(path).replace(os.sep, '/')
+
+
+def compile_templates():
+    """Компилируем шаблоны из DIRS; с cached.Loader они там и остаются."""
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.engine.dirs:
+            for name in project_templates(directory):
+                engine.get_template(name)
+                count += 1
+    return count
+
+
+def build_resolvers():
+    """Строим резолверы и компилируем регулярные выражения маршрутов."""
+    count = 0
+
+    def walk(resolver):
+        nonlocal count
+        for pattern in resolver.url_patterns:
+            pattern.pattern.regex
+            count += 1
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern)
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+    walk(resolver)
+    str(settings.LOGIN_URL)
+    str(settings.LOGIN_REDIRECT_URL)
+    return count
+
+
+def load_locale():
+    translation.activate(settings.LANGUAGE_CODE)
+    try:
+        translation.gettext('Log in')
+        formats.date_format(timezone.localdate())
+    finally:
+        translation.deactivate()
+
+
+def warm_up():
+    with timed('templates'):
+        templates = compile_templates()
+    with timed('urls'):
+        patterns = build_resolvers()
+    with timed('locale'):
+        load_locale()
+    return {'templates': templates, 'patterns': patterns}
+
+
+def record_boot(started):
+    """Записываем время старта воркера (от импорта точки входа)."""
+    total = perf_counter() - started
+    warm = sum(
+        seconds for stage, seconds in metrics.BOOT_TIMINGS.items()
+        if stage != 'import'
+    )
+    metrics.BOOT_TIMINGS['import'] = total - warm
+    logger.info(
+        'Воркер %s готов за %.3f с: %s', os.getpid(), total,
+        ', '.join(
+            f'{stage} {seconds:.3f} с'
+            for stage, seconds in sorted(metrics.BOOT_TIMINGS.items())
+        ),
+    )
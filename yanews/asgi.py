@@ -8,9 +8,21 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
+from time import perf_counter
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
+# Под ASGI лента и страница новости обслуживаются нативными async view.
+os.environ.setdefault('NEWS_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+started = perf_counter()
+django_application = get_asgi_application()
+
+# После настройки Django.
+from news.live import LiveEvents  # noqa: E402
+from news.warmup import record_boot  # noqa: E402
+
+# Поток событий новости держит LiveEvents, остальное — Django.
+application = LiveEvents(django_application)
+record_boot(started)
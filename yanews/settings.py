@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,23 +22,38 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.middleware.StaticFilesMiddleware',
+    'news.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news.middleware.PersonalizeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yanews.urls'
 
+# Прогрев воркера при старте (news/warmup.py) и кеш скомпилированных
+# шаблонов. По умолчанию включён, когда DEBUG выключен.
+WARM_START = os.environ.get('NEWS_WARM_START', '0' if DEBUG else '1') == '1'
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if WARM_START else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -55,9 +71,72 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    # Соединение только для чтения к тому же файлу: в режиме WAL читатели
+    # не ждут писателя. На проде здесь может быть настоящая реплика.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['news.db.PrimaryReplicaRouter']
+
+# PRAGMA, которые выполняются при открытии каждого соединения SQLite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Кеш обязан быть общим для всех воркеров: версии фрагментов, страницы
+# и блокировки пересборки сбрасываются и ставятся записью в кеш.
+# Локальный кеш процесса годится только для runserver и тестов; в
+# остальных случаях по умолчанию берётся файловый кеш, общий для
+# воркеров одной машины. В бою — memcached:
+# NEWS_CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# NEWS_CACHE_LOCATION=127.0.0.1:11211
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('NEWS_CACHE_BACKEND', (
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else 'django.core.cache.backends.filebased.FileBasedCache'
+        )),
+        'LOCATION': os.environ.get(
+            'NEWS_CACHE_LOCATION', str(BASE_DIR / '.cache')
+        ),
     }
 }
 
+# Сессии читаются из кеша, а пишутся и в кеш, и в базу. С кешем
+# процесса выход из аккаунта в одном воркере не закрыл бы сессию в
+# остальных, поэтому тогда сессии читаются только из базы.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.db'
+    if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES
+    else 'django.contrib.sessions.backends.cached_db'
+)
+
+# ModelBackend остаётся в списке, чтобы сессии, выданные через него,
+# продолжали работать.
+AUTHENTICATION_BACKENDS = [
+    'news.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Сколько секунд держать в кеше пользователя авторизованной сессии.
+USER_CACHE_TIMEOUT = 60 * 15
+
+# Фрагменты страниц живут до смены версии новости, но не дольше суток.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд один воркер может пересобирать фрагмент.
+FRAGMENT_CACHE_LOCK_TIMEOUT = 5
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -73,6 +152,16 @@ USE_L10N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Имена с хешем и .gz/.br-копии создаются при collectstatic.
+STATICFILES_STORAGE = 'news.storage.CompressedManifestStaticFilesStorage'
+# Файлы меньше этого размера (в байтах) не сжимаем.
+STATIC_COMPRESS_MIN_SIZE = 1024
+# Отдавать собранную статику самим (без CDN и веб-сервера перед нами).
+SERVE_STATIC = True
+# Сколько секунд кешировать файлы без хеша в имени.
+STATIC_MAX_AGE = 60
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -80,3 +169,46 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+NEWS_COUNT_ON_ARCHIVE_PAGE = 10
+NEWS_COUNT_ON_SEARCH_PAGE = 10
+COMMENTS_COUNT_ON_DETAIL_PAGE = 50
+# Сколько записей отдаётся в RSS/Atom-лентах.
+FEED_ITEMS = 20
+# Комментарии новостей старше стольких дней уходят в архив
+# (команда archive_comments).
+COMMENT_ARCHIVE_AFTER_DAYS = 365
+
+# Живая лента комментариев (news/live.py, только под ASGI): пауза между
+# keepalive в секундах, размер очереди клиента и задержка переподключения.
+LIVE_KEEPALIVE = 15
+LIVE_QUEUE_SIZE = 100
+LIVE_RETRY_MS = 3000
+
+# «Самое обсуждаемое» на главной (news/trending.py): окна рейтинга,
+# длина интервала счётчиков и как часто пересчитывать блок, в секундах.
+TRENDING_WINDOWS = (('За час', 60 * 60), ('За сутки', 60 * 60 * 24))
+TRENDING_BUCKET_SECONDS = 60 * 5
+TRENDING_REFRESH = 60
+TRENDING_SIZE = 5
+# Сколько последних комментариев редактируется прямо на странице новости
+# в админке; остальные — в отдельном списке комментариев.
+ADMIN_INLINE_COMMENTS = 20
+
+# Асинхронные версии ленты и страницы новости; включаются в yanews/asgi.py.
+NEWS_ASYNC_VIEWS = os.environ.get('NEWS_ASYNC_VIEWS') == '1'
+# Разрешить асинхронным view параллельные запросы к базе из разных потоков.
+# Каждый такой запрос открывает и закрывает своё соединение, и на коротких
+# запросах это медленнее общего потока; включайте только для долгих
+# запросов к базе за пулом соединений.
+ASYNC_DB_CONCURRENT = os.environ.get('ASYNC_DB_CONCURRENT') == '1'
+
+# Отдавать ли накопленные метрики по адресу /metrics/.
+METRICS_ENDPOINT_ENABLED = False
+
+# Сколько строк за раз читает из базы потоковое API.
+API_CHUNK_SIZE = 2000
+# Больше записей за ответ под ASGI не отдаётся: там ответ не потоковый.
+API_ASGI_PAGE_SIZE = 1000
+
+# Как часто (в секундах) воркер сверяет список стоп-слов с базой.
+BAD_WORDS_RELOAD_INTERVAL = 30
@@ -8,9 +8,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 """
 
 import os
+from time import perf_counter
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
+started = perf_counter()
 application = get_wsgi_application()
+
+from news.warmup import record_boot  # noqa: E402 (после настройки Django)
+
+record_boot(started)